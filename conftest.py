@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def synchronous_thumbnails():
+    """Миниатюры строятся до конца теста, пока жив его MEDIA_ROOT."""
+    from posts.tests.utils import synchronous_thumbnails
+
+    with synchronous_thumbnails():
+        yield
@@ -0,0 +1,137 @@
+"""Сериализаторы постов и комментариев с выбором полей через ?fields=.
+
+Поле знает, какие столбцы и связи ему нужны, поэтому queryset
+загружает только запрошенное: без author не будет JOIN с авторами,
+без text — самого текста. Всё, что требует отдельных запросов
+(миниатюры), добирается одним запросом на страницу. Поле со scope
+зависит от области кеша самого объекта: страница списка с таким
+полем сбрасывается и при её изменении.
+"""
+from posts import thumbnails
+
+
+class FieldError(ValueError):
+    """В ?fields= есть поля, которых у сериализатора нет."""
+
+
+class Field:
+    def __init__(self, get, columns=(), related=(), prefetch=None,
+                 scope=None):
+        self.get = get
+        self.columns = columns
+        self.related = related
+        self.prefetch = prefetch
+        self.scope = scope
+
+
+def image_url(post):
+    return post.image.url if post.image else None
+
+
+def thumbnail_url(post):
+    thumbnail = post.thumbnails.get('card')
+    return thumbnail.url if thumbnail else None
+
+
+class Serializer:
+    fields = {}
+    default = ()
+
+    def __init__(self, requested=None):
+        """requested — строка ?fields= через запятую; пусто — default.
+
+        Для неизвестных полей бросает FieldError.
+        """
+        names = [name.strip() for name in (requested or '').split(',')]
+        names = [name for name in names if name] or list(self.default)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise FieldError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(self.fields)}.'
+            )
+        self.names = list(dict.fromkeys(names))
+
+    def prepare(self, queryset, *columns):
+        """Только нужные столбцы и связи запрошенных полей и columns."""
+        columns, related = {'pk', *columns}, set()
+        for name in self.names:
+            field = self.fields[name]
+            columns.update(field.columns)
+            related.update(field.related)
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        return queryset.only(*sorted(columns))
+
+    def scopes(self, objects):
+        """Области кеша, от которых зависят запрошенные поля objects."""
+        formats = {
+            self.fields[name].scope for name in self.names
+            if self.fields[name].scope
+        }
+        return [
+            scope.format(pk=obj.pk)
+            for scope in sorted(formats) for obj in objects
+        ]
+
+    def serialize(self, objects):
+        objects = list(objects)
+        for name in self.names:
+            if self.fields[name].prefetch:
+                self.fields[name].prefetch(objects)
+        return [
+            {name: self.fields[name].get(obj) for name in self.names}
+            for obj in objects
+        ]
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': Field(lambda post: post.pk),
+        'text': Field(lambda post: post.text, ('text',)),
+        'pub_date': Field(
+            lambda post: post.pub_date.isoformat(), ('pub_date',)
+        ),
+        'author': Field(
+            lambda post: post.author.username,
+            ('author__username',), ('author',),
+        ),
+        'group': Field(
+            lambda post: post.group.slug if post.group_id else None,
+            ('group__slug',), ('group',),
+        ),
+        'image': Field(image_url, ('image',)),
+        'image_width': Field(
+            lambda post: post.image_width, ('image_width',)
+        ),
+        'image_height': Field(
+            lambda post: post.image_height, ('image_height',)
+        ),
+        'thumbnail': Field(
+            thumbnail_url, ('image',), prefetch=thumbnails.prefetch
+        ),
+        'comments_count': Field(
+            lambda post: post.comments_count, ('comments_count',),
+            scope='post:{pk}',
+        ),
+    }
+    default = (
+        'id', 'text', 'pub_date', 'author', 'group', 'image',
+        'comments_count',
+    )
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': Field(lambda comment: comment.pk),
+        'post': Field(lambda comment: comment.post_id, ('post',)),
+        'author': Field(
+            lambda comment: comment.author.username,
+            ('author__username',), ('author',),
+        ),
+        'text': Field(lambda comment: comment.text, ('text',)),
+        'created': Field(
+            lambda comment: comment.created.isoformat(), ('created',)
+        ),
+    }
+    default = ('id', 'post', 'author', 'text', 'created')
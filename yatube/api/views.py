@@ -0,0 +1,131 @@
+"""JSON API только для чтения: те же ленты и посты, что и страницы posts.
+
+Страницы выбираются курсором ?cursor= (CursorPaginator), размер —
+?limit=, поля — ?fields=. Публичные ответы кешируются и получают
+ETag так же, как HTML-страницы (posts.caching.cached_view). Списки
+постов зависят ещё и от областей постов страницы: comments_count
+меняется с каждым комментарием.
+"""
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from posts.caching import cached_view, depend_on
+from posts.models import Group, Post, User
+from posts.servises import PAGINATOR_QUANTITY, CursorPaginator
+from posts.timeline import get_feed
+
+from .serializers import CommentSerializer, FieldError, PostSerializer
+
+MAX_LIMIT = 100
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def error(status, detail):
+    return json_response({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """Только GET и HEAD; ошибки отдаются в JSON, а не HTML-страницей."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except FieldError as exc:
+            return error(400, str(exc))
+        except Http404:
+            return error(404, 'Не найдено.')
+    return wrapper
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET['limit'])
+    except (KeyError, ValueError):
+        return PAGINATOR_QUANTITY
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def paginate(request, queryset, serializer, key='-pub_date'):
+    """Страница queryset по ?cursor= со ссылками на соседние страницы."""
+    paginator = CursorPaginator(
+        serializer.prepare(queryset, key.lstrip('-')),
+        get_limit(request),
+        key=key,
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    depend_on(request, *serializer.scopes(page_obj.object_list))
+    return json_response({
+        'results': serializer.serialize(page_obj.object_list),
+        'next': page_url(request, page_obj.next_cursor),
+        'previous': page_url(request, page_obj.previous_cursor),
+    })
+
+
+@cached_view('feed', depends=True)
+@api_view
+def post_list(request):
+    serializer = PostSerializer(request.GET.get('fields'))
+    return paginate(request, Post.objects.all(), serializer)
+
+
+@cached_view('group:{slug}', depends=True)
+@api_view
+def group_post_list(request, slug):
+    serializer = PostSerializer(request.GET.get('fields'))
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return paginate(request, group.posts.all(), serializer)
+
+
+@cached_view('profile:{username}', depends=True)
+@api_view
+def profile_post_list(request, username):
+    serializer = PostSerializer(request.GET.get('fields'))
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return paginate(request, author.posts.all(), serializer)
+
+
+@api_view
+def follow_post_list(request):
+    """Лента подписок: своя у каждого, поэтому не кешируется на сервере."""
+    if not request.user.is_authenticated:
+        return error(401, 'Нужно войти.')
+    serializer = PostSerializer(request.GET.get('fields'))
+    response = paginate(request, get_feed(request.user), serializer)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@cached_view('post:{post_id}')
+@api_view
+def post_item(request, post_id):
+    serializer = PostSerializer(request.GET.get('fields'))
+    post = get_object_or_404(
+        serializer.prepare(Post.objects.all()), pk=post_id
+    )
+    return json_response(serializer.serialize([post])[0])
+
+
+@cached_view('post:{post_id}')
+@api_view
+def comment_list(request, post_id):
+    serializer = CommentSerializer(request.GET.get('fields'))
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return paginate(request, post.comments.all(), serializer, key='created')
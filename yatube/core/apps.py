@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas)
+        if settings.QUERYLOG_ENABLED:
+            from . import querylog
+            connection_created.connect(querylog.install)
@@ -0,0 +1,224 @@
+"""Замеры страниц сайта через тестовый клиент Django."""
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from importlib import import_module
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache, caches
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Модули URL, все маршруты которых замеряются; пространство имён
+# берётся из app_name модуля.
+URL_MODULES = ('posts.urls', 'api.urls', 'users.urls', 'about.urls')
+PERCENTILES = (50, 90, 95, 99)
+# Дополнительные параметры запроса для отдельных маршрутов.
+QUERY = {
+    'posts:search': lambda sample: {'q': sample['post'].text.split()[0]},
+}
+# Маршруты, которые разлогинивают клиента.
+LOGOUT = ('users:logout',)
+
+
+def percentile(values, percent):
+    """Процентиль с линейной интерполяцией между соседними значениями."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower
+    )
+
+
+def get_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_sample():
+    """Типичные тяжёлые объекты: самый активный автор, читатель и группа."""
+    author = User.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total', 'pk').first()
+    post = Post.objects.filter(author=author).first()
+    if post is None:
+        raise LookupError('В базе нет постов для замеров.')
+    reader = User.objects.annotate(
+        total=Count('follower')
+    ).order_by('-total', 'pk').first()
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total', 'pk').first()
+    return {
+        'post': post,
+        'author': author,
+        'reader': reader,
+        'group': group,
+    }
+
+
+def get_routes(sample):
+    """Маршруты {имя: адрес} всех URL_MODULES с подставленными объектами."""
+    reader = sample['reader']
+    kwargs = {
+        'post_id': sample['post'].pk,
+        'username': sample['author'].username,
+        'slug': sample['group'].slug if sample['group'] else None,
+        'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+        'token': default_token_generator.make_token(reader),
+    }
+    routes = {}
+    for module_name in URL_MODULES:
+        module = import_module(module_name)
+        for pattern in module.urlpatterns:
+            name = f'{module.app_name}:{pattern.name}'
+            params = {
+                param: kwargs[param]
+                for param in pattern.pattern.converters
+            }
+            if None in params.values():
+                continue
+            routes[name] = reverse(name, kwargs=params)
+    return routes
+
+
+class Benchmark:
+    """Прогоняет каждый маршрут iterations раз и собирает метрики.
+
+    Время и число запросов берутся из замеряемых прогонов, пик памяти —
+    из отдельного прогона под tracemalloc, который сам замедляет код.
+    cold=True очищает кеш перед каждым запросом. Изменения данных
+    (подписки, выход) откатываются после каждого маршрута.
+    """
+
+    def __init__(self, iterations=20, warmup=2, cold=False):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.cold = cold
+        self.sample = get_sample()
+        self.client = Client()
+        self.login()
+
+    def login(self):
+        self.client.force_login(self.sample['reader'])
+
+    def request(self, name, url):
+        if self.cold:
+            cache.clear()
+        if name in LOGOUT:
+            self.login()
+        data = QUERY[name](self.sample) if name in QUERY else {}
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.get(url, data)
+            elapsed = time.perf_counter() - started
+        return response, elapsed, queries
+
+    def measure(self, name, url):
+        for _ in range(self.warmup):
+            self.request(name, url)
+        timings = []
+        query_counts = []
+        query_times = []
+        for _ in range(self.iterations):
+            response, elapsed, queries = self.request(name, url)
+            timings.append(elapsed * 1000)
+            query_counts.append(len(queries))
+            query_times.append(sum(
+                float(query['time']) for query in queries.captured_queries
+            ) * 1000)
+        tracemalloc.start()
+        try:
+            self.request(name, url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        result = {
+            'url': url,
+            'status': response.status_code,
+            'iterations': self.iterations,
+            'mean_ms': statistics.mean(timings),
+            'max_ms': max(timings),
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = percentile(timings, percent)
+        result.update({
+            'queries': max(query_counts),
+            'query_ms': statistics.median(query_times),
+            'peak_memory_kb': peak / 1024,
+        })
+        return result
+
+    def run(self, only=None):
+        routes = get_routes(self.sample)
+        results = {}
+        for name, url in routes.items():
+            if only and not any(part in name for part in only):
+                continue
+            with transaction.atomic():
+                results[name] = self.measure(name, url)
+                transaction.set_rollback(True)
+        return {
+            'meta': {
+                'revision': get_revision(),
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cache': caches['default'].__class__.__name__,
+                'cold': self.cold,
+                'dataset': {
+                    'users': User.objects.count(),
+                    'groups': Group.objects.count(),
+                    'posts': Post.objects.count(),
+                    'comments': Comment.objects.count(),
+                    'follows': Follow.objects.count(),
+                },
+            },
+            'routes': results,
+        }
+
+
+def compare(current, baseline, metric='p95_ms'):
+    """Строки (маршрут, было, стало, изменение в %) по общим маршрутам."""
+    rows = []
+    for name, result in current['routes'].items():
+        before = baseline['routes'].get(name, {}).get(metric)
+        if before is None:
+            continue
+        after = result[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        rows.append((name, before, after, change))
+    return rows
+
+
+def load(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(report, stream, ensure_ascii=False, indent=2)
@@ -0,0 +1,94 @@
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+L1_TIMEOUT = 5
+MISSING = object()
+
+
+class TwoLevelCache(BaseCache):
+    """Общий кеш L2 с короткоживущей копией горячих ключей в процессе.
+
+    LOCATION — имя общего кеша в CACHES, OPTIONS['L1_TIMEOUT'] —
+    сколько секунд процесс может отдавать значение, не спрашивая L2.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._l2_alias = location
+        options = params.get('OPTIONS', {})
+        self._l1_timeout = options.get('L1_TIMEOUT', L1_TIMEOUT)
+        self._l1 = LocMemCache(f'two-level:{location}', {
+            'TIMEOUT': self._l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+        })
+
+    @property
+    def _l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_timeout_for(self, timeout):
+        if timeout == DEFAULT_TIMEOUT or timeout is None:
+            return self._l1_timeout
+        return min(timeout, self._l1_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._l2.add(key, value, timeout, version)
+        if added:
+            self._l1.set(key, value, self._l1_timeout_for(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self._l1.get(key, MISSING, version)
+        if value is not MISSING:
+            return value
+        value = self._l2.get(key, MISSING, version)
+        if value is MISSING:
+            return default
+        self._l1.set(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        """Ключей, которых нет в L1, L2 касается одним запросом."""
+        keys = list(keys)
+        found = self._l1.get_many(keys, version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            fetched = self._l2.get_many(missing, version)
+            self._l1.set_many(fetched, version=version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l2.set(key, value, timeout, version)
+        self._l1.set(key, value, self._l1_timeout_for(timeout), version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._l2.set_many(data, timeout, version)
+        self._l1.set_many(data, self._l1_timeout_for(timeout), version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1.delete(key, version)
+        return self._l2.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self._l2.incr(key, delta, version)
+        self._l1.set(key, value, version=version)
+        return value
+
+    def delete(self, key, version=None):
+        self._l1.delete(key, version)
+        self._l2.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._l1.delete_many(keys, version)
+        self._l2.delete_many(keys, version)
+
+    def clear(self):
+        self._l1.clear()
+        self._l2.clear()
+
+    def close(self, **kwargs):
+        self._l2.close(**kwargs)
@@ -0,0 +1,15 @@
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created: настройки SQLITE_PRAGMAS.
+
+    PRAGMA действуют только на текущее соединение (кроме journal_mode,
+    который запоминается в файле базы), поэтому задаются при каждом
+    открытии.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,82 @@
+"""PostgreSQL с пулом соединений psycopg2 в каждом процессе.
+
+Открытие соединения берёт готовое из пула, закрытие возвращает его
+обратно, поэтому даже с CONN_MAX_AGE = 0 запрос не тратит время
+на установку соединения. Размер пула задают ключи MIN и MAX словаря
+DATABASES[alias]['POOL']; MAX должен быть не меньше числа потоков
+сервера. Если все MAX соединений заняты, поток ждёт свободного
+до TIMEOUT секунд, а не получает ошибку сразу.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class WaitingConnectionPool(pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool, который при исчерпании ждёт соединения.
+
+    Семафор на maxconn мест берётся в getconn и отпускается в putconn;
+    PoolError бросается, только если места не освободилось за timeout.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pool.PoolError(
+                f'Все соединения пула заняты дольше {self.timeout} с.'
+            )
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._slots.release()
+
+
+def get_pool(conn_params, options):
+    """Пул для набора параметров: у тестовой базы он свой."""
+    key = tuple(sorted(conn_params.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = WaitingConnectionPool(
+                options.get('MIN', 1), options.get('MAX', 20),
+                options.get('TIMEOUT', 10), **conn_params
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pool = None
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(conn_params, self.settings_dict.get('POOL', {}))
+        connection = self.pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        """Возвращает соединение в пул; сломанное пул закрывает."""
+        if self.connection is not None:
+            broken = self.connection.closed or (
+                self.errors_occurred and not self.is_usable()
+            )
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection, close=broken)
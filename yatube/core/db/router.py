@@ -0,0 +1,84 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики из DATABASE_REPLICAS отстают от основной базы, поэтому поток,
+который уже писал, до конца запроса читает из основной. Между
+запросами то же обеспечивает ReplicaPinMiddleware: после записи
+клиент получает cookie PIN_COOKIE и REPLICA_PIN_SECONDS секунд
+читает из основной базы — автор после post_create сразу видит
+свой пост в профиле.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_db'
+# Приложения, которые в том же запросе читают только что записанное:
+# сессии и кеш в БД. Их запись не считается записью клиента.
+PRIMARY_APPS = ('sessions', 'django_cache')
+
+_local = threading.local()
+
+
+def is_pinned():
+    return getattr(_local, 'pinned', False)
+
+
+def has_written():
+    return getattr(_local, 'written', False)
+
+
+def pin():
+    _local.pinned = True
+
+
+def reset():
+    _local.pinned = False
+    _local.written = False
+
+
+@contextmanager
+def primary():
+    """Все запросы внутри блока идут в основную базу.
+
+    Запись внутри блока закрепляет поток и после него, как и вне блока.
+    """
+    pinned = is_pinned()
+    pin()
+    try:
+        yield
+    finally:
+        _local.pinned = pinned or has_written()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas or is_pinned()
+            or model._meta.app_label in PRIMARY_APPS
+            # Внутри транзакции читаем то, что она уже записала.
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_APPS:
+            _local.written = True
+            pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же строки, что и основная база.
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
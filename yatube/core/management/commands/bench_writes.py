@@ -0,0 +1,133 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmark import percentile
+from posts.models import Post, User
+
+USERNAME = 'bench_writer_{}_{}'
+VIEWS = ('post_create', 'add_comment')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность записи post_create и add_comment '
+        'при нескольких одновременных клиентах, чтобы сравнить настройки '
+        'базы данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Запросов от каждого клиента.',
+        )
+        parser.add_argument('--view', choices=VIEWS, nargs='+', default=VIEWS)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не удалять созданных пользователей и их записи.',
+        )
+
+    def describe_database(self):
+        settings_dict = connection.settings_dict
+        line = (
+            f'{connection.vendor}, CONN_MAX_AGE='
+            f'{settings_dict["CONN_MAX_AGE"]}'
+        )
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                pragmas = []
+                for name in ('journal_mode', 'synchronous', 'busy_timeout'):
+                    cursor.execute(f'PRAGMA {name}')
+                    pragmas.append(f'{name}={cursor.fetchone()[0]}')
+            line += ', ' + ', '.join(pragmas)
+        return line
+
+    def run(self, clients, requests, url, data):
+        """Запускает клиентов одновременно; [(время, ошибка или None)]."""
+        barrier = threading.Barrier(len(clients))
+        results = []
+        results_lock = threading.Lock()
+
+        def work(client):
+            barrier.wait()
+            timings = []
+            try:
+                for _ in range(requests):
+                    error = None
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(url, data)
+                        if response.status_code != 302:
+                            error = f'HTTP {response.status_code}'
+                    except DatabaseError as exc:
+                        error = str(exc)
+                    timings.append((time.perf_counter() - started, error))
+            finally:
+                connections.close_all()
+                with results_lock:
+                    results.extend(timings)
+
+        with ThreadPoolExecutor(len(clients)) as pool:
+            list(pool.map(work, clients))
+        return results
+
+    def report(self, name, results, elapsed):
+        timings = [duration * 1000 for duration, _ in results]
+        errors = [error for _, error in results if error]
+        self.stdout.write(
+            f'{name}: {len(results)} запросов за {elapsed:.2f} с, '
+            f'{len(results) / elapsed:.1f} запросов/с, '
+            f'p50 {percentile(timings, 50):.1f} мс, '
+            f'p95 {percentile(timings, 95):.1f} мс, '
+            f'макс. {max(timings):.1f} мс'
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(
+                f'  ошибок: {len(errors)}, например: {errors[0]}'
+            ))
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError('Нужен хотя бы один клиент и один запрос.')
+        self.stdout.write(self.describe_database())
+        # Свои имена на каждый запуск: удаляются только созданные им.
+        run = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create(username=USERNAME.format(run, number))
+            for number in range(options['clients'])
+        ]
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        target = Post.objects.create(
+            author=users[0], text='Пост для замера комментариев'
+        )
+        cases = {
+            'post_create': (reverse('posts:post_create'), {
+                'text': 'Пост из замера записи',
+            }),
+            'add_comment': (
+                reverse('posts:add_comment', args=[target.pk]),
+                {'text': 'Комментарий из замера записи'},
+            ),
+        }
+        try:
+            for name in options['view']:
+                url, data = cases[name]
+                started = time.perf_counter()
+                results = self.run(clients, options['requests'], url, data)
+                self.report(name, results, time.perf_counter() - started)
+        finally:
+            if not options['keep']:
+                User.objects.filter(
+                    pk__in=[user.pk for user in users]
+                ).delete()
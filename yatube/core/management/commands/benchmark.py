@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import Benchmark, compare, load, save
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа, число SQL-запросов и память для всех '
+        'страниц posts, users и about на текущих данных и сохраняет '
+        'результат в JSON для сравнения между коммитами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--only', nargs='+',
+            help='Замерять только маршруты, в имени которых есть подстрока.',
+        )
+        parser.add_argument('--output', help='Куда записать JSON.')
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='JSON прошлого прогона для сравнения p95.',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше нуля.')
+        try:
+            benchmark = Benchmark(
+                options['iterations'], options['warmup'], options['cold']
+            )
+        except LookupError as error:
+            raise CommandError(str(error))
+        report = benchmark.run(options['only'])
+        self.stdout.write(
+            f'{"маршрут":<32} {"код":>4} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"SQL":>4} {"SQL мс":>7} {"память":>9}'
+        )
+        for name, result in report['routes'].items():
+            self.stdout.write(
+                f'{name:<32} {result["status"]:>4} '
+                f'{result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} '
+                f'{result["p99_ms"]:>8.2f} {result["queries"]:>4} '
+                f'{result["query_ms"]:>7.2f} '
+                f'{result["peak_memory_kb"]:>7.0f}КБ'
+            )
+        if options['output']:
+            save(report, options['output'])
+            self.stdout.write(f'Результат записан в {options["output"]}')
+        if options['compare']:
+            self.stdout.write(self.style.MIGRATE_HEADING('p95, мс:'))
+            for name, before, after, change in compare(
+                report, load(options['compare'])
+            ):
+                style = self.style.WARNING if change > 10 else (
+                    self.style.SUCCESS
+                )
+                self.stdout.write(style(
+                    f'{name:<32} {before:>8.2f} → {after:>8.2f} '
+                    f'({change:+.0f}%)'
+                ))
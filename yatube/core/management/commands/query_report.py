@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core.querylog import SORTS, get_report, reset
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает сводку SQL-запросов по отпечаткам или по view: '
+        'число, суммарное и среднее время, p95 и максимум.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--by', choices=('fingerprint', 'view'), default='fingerprint'
+        )
+        parser.add_argument('--sort', choices=SORTS, default='total')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить сводку во всех процессах.',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset()
+            self.stdout.write(self.style.SUCCESS('Сводка обнулена.'))
+            return
+        rows = get_report(options['by'], options['sort'], options['limit'])
+        if not rows:
+            self.stdout.write('Запросов пока не было.')
+            return
+        self.stdout.write(
+            f'{"число":>8} {"всего мс":>10} {"сред.":>8} {"p95":>8} '
+            f'{"макс.":>8}  запрос'
+        )
+        for row in rows:
+            where = f'[{row["view"]}] ' if row['view'] else ''
+            self.stdout.write(
+                f'{row["count"]:>8} {row["total"]:>10.1f} '
+                f'{row["mean"]:>8.2f} {row["p95"]:>8.2f} '
+                f'{row["max"]:>8.2f}  {where}{row["sql"][:120]}'
+            )
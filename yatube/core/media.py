@@ -0,0 +1,175 @@
+"""Отдача файлов MEDIA_ROOT без DEBUG.
+
+MEDIA_SERVE выбирает способ: python — FileResponse из процесса
+(sendfile через wsgi.file_wrapper), x-accel — заголовок
+X-Accel-Redirect для nginx, x-sendfile — X-Sendfile для Apache
+и lighttpd. Условные запросы проверяются здесь по ETag из размера
+и времени изменения файла; диапазоны при передаче фронтовому серверу
+обрабатывает он сам.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from posts.storage import is_hashed
+
+OFFLOAD_MODES = ('x-accel', 'x-sendfile')
+# Миниатюры sorl: имя — хеш имени исходника и параметров, а исходники
+# названы по хешу содержимого, так что файл под таким именем не меняется.
+THUMBNAIL_NAME = re.compile(r'cache/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32}\.\w+')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+class FileRange:
+    """Часть файла для FileResponse: read() не выходит за диапазон.
+
+    fileno() отдаёт дескриптор, уже сдвинутый на начало диапазона:
+    wsgi.file_wrapper gunicorn шлёт его через sendfile, ограничиваясь
+    Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def is_immutable(name):
+    """Содержимое файла с таким именем никогда не меняется."""
+    return is_hashed(name) or THUMBNAIL_NAME.fullmatch(name) is not None
+
+
+def parse_range(header, size):
+    """Диапазон (начало, конец включительно) из заголовка Range или None.
+
+    Несколько диапазонов и непонятный заголовок дают None — тогда,
+    как разрешает RFC 7233, отдаётся весь файл. Для диапазона за концом
+    файла — ValueError.
+    """
+    match = RANGE.fullmatch(header.replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1
+        if not int(last):
+            raise ValueError('Пустой диапазон в конце файла.')
+    if start >= size:
+        raise ValueError('Диапазон начинается за концом файла.')
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """Range применим: If-Range нет или он совпадает с текущей версией."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def stream(request, path, content_type, size, etag, last_modified):
+    """Ответ из процесса: весь файл или диапазон из Range."""
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if header and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    if request.method == 'HEAD':
+        response = HttpResponse()
+    else:
+        response = FileResponse(FileRange(open(path, 'rb'), start, length))
+    if byte_range is not None:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Type'] = content_type
+    response['Content-Length'] = length
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def offload(path, name, content_type):
+    """Пустой ответ, файл к которому добавит фронтовой сервер."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SERVE == 'x-accel':
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_PREFIX + name
+        )
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Файл из MEDIA_ROOT способом MEDIA_SERVE."""
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        status = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден.')
+    if not stat.S_ISREG(status.st_mode):
+        raise Http404('Файл не найден.')
+    etag = quote_etag(f'{status.st_mtime_ns:x}-{status.st_size:x}')
+    last_modified = int(status.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        if settings.MEDIA_SERVE in OFFLOAD_MODES:
+            response = offload(fullpath, path, content_type)
+        else:
+            response = stream(
+                request, fullpath, content_type, status.st_size,
+                etag, last_modified,
+            )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if is_immutable(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_MAX_AGE
+        )
+    return response
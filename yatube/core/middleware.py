@@ -0,0 +1,179 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import profiling, querylog, staticfiles
+from .db import router
+
+logger = logging.getLogger('yatube.performance')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def server_timing(metrics):
+    """Значение заголовка Server-Timing из [(имя, мс или None, описание)]."""
+    entries = []
+    for name, duration, description in metrics:
+        entry = name
+        if duration is not None:
+            entry += f';dur={duration:.1f}'
+        if description:
+            entry += f';desc="{description}"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class PerformanceMiddleware:
+    """Замеряет время запроса, SQL, шаблоны, кеш и миниатюры.
+
+    Подробно замеряется доля PERF_SAMPLE_RATE запросов: им добавляется
+    заголовок Server-Timing и пишется строка JSON в лог
+    yatube.performance. У остальных замеряется только общее время,
+    и в лог попадают лишь те, что медленнее PERF_SLOW_MS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PERF_SAMPLE_RATE:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            total = (time.perf_counter() - started) * 1000
+            if total >= settings.PERF_SLOW_MS:
+                self.log(request, response, {'total_ms': round(total, 1)})
+            return response
+        profiling.instrument_cache(caches['default'])
+        with ExitStack() as stack:
+            recorder = stack.enter_context(profiling.recording())
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(recorder.execute)
+                )
+            response = self.get_response(request)
+        total = (time.perf_counter() - recorder.started) * 1000
+        sql = recorder.query_time * 1000
+        template = recorder.timings['template'] * 1000
+        thumbnails = recorder.timings['thumbnails'] * 1000
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = server_timing([
+                ('total', total, None),
+                ('sql', sql, f'{recorder.query_count} queries'),
+                ('tpl', template, None),
+                ('thumb', thumbnails, None),
+                ('cache', None, (
+                    f'{recorder.cache_hits} hits, '
+                    f'{recorder.cache_misses} misses'
+                )),
+            ])
+        duplicates = recorder.duplicates
+        self.log(request, response, {
+            'total_ms': round(total, 1),
+            'sql_count': recorder.query_count,
+            'sql_ms': round(sql, 1),
+            'sql_duplicates': sum(duplicates.values()),
+            'sql_similar': recorder.similar,
+            'template_ms': round(template, 1),
+            'thumbnail_ms': round(thumbnails, 1),
+            'cache_hits': recorder.cache_hits,
+            'cache_misses': recorder.cache_misses,
+            'duplicate_sql': [sql[:200] for sql in duplicates],
+        })
+        return response
+
+    def log(self, request, response, metrics):
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **metrics,
+        }, ensure_ascii=False))
+
+
+class QueryLogMiddleware:
+    """Помечает запросы к БД именем view и отдаёт сводку querylog в кеш.
+
+    Включается QUERYLOG_ENABLED=1.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERYLOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            querylog.set_view(None)
+        querylog.aggregator.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        querylog.set_view(request.resolver_match.view_name)
+
+
+class ReplicaPinMiddleware:
+    """Читать свою запись при чтении с реплик.
+
+    Запросы, меняющие данные, и клиенты с cookie router.PIN_COOKIE
+    читают из основной базы. Если запрос что-то записал, cookie
+    ставится на REPLICA_PIN_SECONDS — за это время реплики догоняют.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        router.reset()
+        if (
+            request.method not in SAFE_METHODS
+            or router.PIN_COOKIE in request.COOKIES
+        ):
+            router.pin()
+        try:
+            response = self.get_response(request)
+            if router.has_written():
+                response.set_cookie(
+                    router.PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            router.reset()
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT, если нет фронтового сервера.
+
+    Включается STATIC_SERVE=1; список файлов читается при запуске,
+    поэтому collectstatic выполняется до старта процесса. FileResponse
+    передаёт файл через wsgi.file_wrapper — у gunicorn и uWSGI это
+    sendfile без копирования в Python.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.files = staticfiles.find_files(
+            settings.STATIC_ROOT, settings.STATIC_URL
+        )
+
+    def __call__(self, request):
+        static = self.files.get(request.path_info)
+        if static is None or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        return static.respond(request)
@@ -0,0 +1,136 @@
+"""Замеры одного запроса: SQL, шаблоны, кеш и произвольные участки кода.
+
+Замеры копятся в Recorder текущего потока, который создаёт
+PerformanceMiddleware для попавших в выборку запросов. Без него
+timer() и обёртки кеша почти ничего не стоят.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from .cache import MISSING
+
+_local = threading.local()
+
+
+class Recorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = defaultdict(float)
+        self.queries = Counter()
+        self.query_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.active = Counter()
+
+    @contextmanager
+    def outermost(self, name):
+        """True только для внешнего из вложенных участков с одним именем.
+
+        Вложенные шаблоны и get_many() через get() не считаются дважды.
+        """
+        self.active[name] += 1
+        try:
+            yield self.active[name] == 1
+        finally:
+            self.active[name] -= 1
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: время и повторы запросов."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.queries[(sql, repr(params))] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        """Запросы, повторённые с теми же параметрами: {sql: лишних раз}."""
+        return {
+            sql: count - 1
+            for (sql, _), count in self.queries.items() if count > 1
+        }
+
+    @property
+    def similar(self):
+        """Лишние запросы с уже встречавшимся текстом: признак N+1."""
+        texts = Counter()
+        for (sql, _), count in self.queries.items():
+            texts[sql] += count
+        return sum(count - 1 for count in texts.values() if count > 1)
+
+
+def current():
+    return getattr(_local, 'recorder', None)
+
+
+@contextmanager
+def recording():
+    recorder = Recorder()
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = None
+
+
+@contextmanager
+def timer(name):
+    """Добавляет время участка к timings[name] текущего запроса."""
+    recorder = current()
+    if recorder is None:
+        yield
+        return
+    with recorder.outermost(name) as outermost:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if outermost:
+                recorder.timings[name] += time.perf_counter() - started
+
+
+def instrument_cache(backend):
+    """Подменяет get и get_many экземпляра кеша, чтобы считать попадания.
+
+    Экземпляры кешей у каждого потока свои, поэтому обёртка ставится
+    на экземпляр текущего потока один раз.
+    """
+    if getattr(backend, 'profiled', False):
+        return
+    get, get_many = backend.get, backend.get_many
+
+    def profiled_get(key, default=None, version=None):
+        recorder = current()
+        if recorder is None:
+            return get(key, default, version)
+        with recorder.outermost('cache') as outermost:
+            value = get(key, MISSING, version)
+        if outermost:
+            if value is MISSING:
+                recorder.cache_misses += 1
+            else:
+                recorder.cache_hits += 1
+        return default if value is MISSING else value
+
+    def profiled_get_many(keys, version=None):
+        recorder = current()
+        if recorder is None:
+            return get_many(keys, version)
+        keys = list(keys)
+        with recorder.outermost('cache') as outermost:
+            values = get_many(keys, version)
+        if outermost:
+            recorder.cache_hits += len(values)
+            recorder.cache_misses += len(keys) - len(values)
+        return values
+
+    backend.get = profiled_get
+    backend.get_many = profiled_get_many
+    backend.profiled = True
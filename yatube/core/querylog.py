@@ -0,0 +1,262 @@
+"""Сводка SQL-запросов по отпечаткам и журнал медленных запросов.
+
+Каждый запрос приводится к отпечатку: литералы и параметры заменяются
+на «?», списки IN (...) схлопываются. Процесс копит по паре
+(view, отпечаток) число запросов, суммарное время и гистограмму
+длительностей для p95 и раз в QUERYLOG_FLUSH_SECONDS кладёт свою
+сводку в кеш под собственным ключом, откуда её собирают команда
+query_report и страница в админке.
+
+Процессы находят друг друга по пронумерованным ячейкам в кеше: номер
+выдаёт атомарный cache.incr, и общий список никто не переписывает.
+Пар (view, отпечаток) в процессе не больше QUERYLOG_MAX_STATS,
+остальные запросы попадают в общую строку OVERFLOW_SQL.
+"""
+import hashlib
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import traceback
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('yatube.sql')
+
+# Верхние границы корзин гистограммы длительностей, мс.
+BUCKETS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+)
+NO_VIEW = '-'
+OVERFLOW_SQL = '(прочие запросы)'
+SLOTS_KEY = 'querylog:slots'
+SLOT_KEY = 'querylog:slot:{}'
+RESET_KEY = 'querylog:reset'
+PROCESS_TIMEOUT = 60 * 60 * 24
+SORTS = ('total', 'count', 'p95', 'max')
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|\?')
+IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACES = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Текст запроса без литералов: одинаков для запросов одного вида."""
+    normalized = STRING.sub('?', sql)
+    normalized = NUMBER.sub('?', normalized)
+    normalized = PLACEHOLDER.sub('?', normalized)
+    normalized = IN_LIST.sub('(...)', normalized)
+    return SPACES.sub(' ', normalized).strip()
+
+
+def fingerprint_id(normalized):
+    return hashlib.md5(normalized.encode()).hexdigest()[:12]
+
+
+def bucket(duration):
+    for number, bound in enumerate(BUCKETS):
+        if duration <= bound:
+            return number
+    return len(BUCKETS)
+
+
+def percentile(histogram, count, maximum, percent=95):
+    """Верхняя граница корзины, в которую попадает процентиль."""
+    wanted = count * percent / 100
+    seen = 0
+    for number, hits in enumerate(histogram):
+        seen += hits
+        if seen >= wanted:
+            return min(BUCKETS[number], maximum) if (
+                number < len(BUCKETS)
+            ) else maximum
+    return maximum
+
+
+def new_stat(view, sql):
+    return {
+        'view': view,
+        'sql': sql,
+        'count': 0,
+        'total': 0.0,
+        'max': 0.0,
+        'histogram': [0] * (len(BUCKETS) + 1),
+    }
+
+
+def merge(target, stat):
+    target['count'] += stat['count']
+    target['total'] += stat['total']
+    target['max'] = max(target['max'], stat['max'])
+    target['histogram'] = [
+        a + b for a, b in zip(target['histogram'], stat['histogram'])
+    ]
+
+
+def origin():
+    """Первый кадр стека из кода проекта: откуда пришёл запрос."""
+    here = os.path.abspath(__file__)
+    for frame in reversed(traceback.extract_stack()):
+        path = os.path.abspath(frame.filename)
+        if (
+            path.startswith(settings.BASE_DIR) and path != here
+            and 'site-packages' not in path
+        ):
+            relative = os.path.relpath(path, settings.BASE_DIR)
+            return f'{relative}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class Aggregator:
+    """Сводка запросов процесса: {(view, id отпечатка): статистика}."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.started = time.time()
+        self.flushed = time.monotonic()
+        self.key = (
+            f'querylog:process:{socket.gethostname()}:{os.getpid()}'
+        )
+        self.slot = None
+
+    def add(self, view, sql, duration):
+        normalized = fingerprint(sql)
+        key = (view, fingerprint_id(normalized))
+        with self.lock:
+            stat = self.stats.get(key)
+            if (
+                stat is None
+                and len(self.stats) >= settings.QUERYLOG_MAX_STATS
+            ):
+                key = (NO_VIEW, fingerprint_id(OVERFLOW_SQL))
+                stat = self.stats.get(key)
+                normalized, view = OVERFLOW_SQL, NO_VIEW
+            if stat is None:
+                stat = self.stats[key] = new_stat(view, normalized)
+            stat['count'] += 1
+            stat['total'] += duration
+            stat['max'] = max(stat['max'], duration)
+            stat['histogram'][bucket(duration)] += 1
+
+    def flush(self, force=False):
+        """Кладёт сводку в кеш не чаще раза в QUERYLOG_FLUSH_SECONDS.
+
+        Если после начала сбора сводку сбросили командой, накопленное
+        процессом отбрасывается.
+        """
+        if not force and (
+            time.monotonic() - self.flushed < settings.QUERYLOG_FLUSH_SECONDS
+        ):
+            return
+        self.flushed = time.monotonic()
+        slot_key = SLOT_KEY.format(self.slot)
+        shared = cache.get_many([slot_key, RESET_KEY])
+        with self.lock:
+            if shared.get(RESET_KEY, 0) > self.started:
+                self.stats = {}
+                self.started = time.time()
+            snapshot = {
+                'started': self.started,
+                'stats': {
+                    key: dict(stat, histogram=list(stat['histogram']))
+                    for key, stat in self.stats.items()
+                },
+            }
+        if shared.get(slot_key) != self.key:
+            # Ячейки ещё нет или её вытеснили из кеша: берём новую.
+            cache.add(SLOTS_KEY, 0, None)
+            self.slot = cache.incr(SLOTS_KEY)
+            slot_key = SLOT_KEY.format(self.slot)
+        cache.set_many({
+            self.key: snapshot,
+            slot_key: self.key,
+        }, PROCESS_TIMEOUT)
+
+
+aggregator = Aggregator()
+
+
+def set_view(view):
+    _local.view = view
+
+
+def execute(execute, sql, params, many, context):
+    """Обёртка выполнения запросов, которую получает каждое соединение."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        view = getattr(_local, 'view', None) or NO_VIEW
+        aggregator.add(view, sql, duration)
+        if duration >= settings.QUERYLOG_SLOW_MS:
+            logger.warning(
+                'Медленный запрос %.1f мс в %s из %s: %s',
+                duration, view, origin(), sql[:1000],
+            )
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created: подключает execute() к соединению."""
+    if execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute)
+
+
+def get_snapshots():
+    """Последние сводки всех процессов, отметившихся в ячейках."""
+    slots = [
+        SLOT_KEY.format(number)
+        for number in range(1, cache.get(SLOTS_KEY, 0) + 1)
+    ]
+    process_keys = set(cache.get_many(slots).values())
+    return cache.get_many(list(process_keys)).values()
+
+
+def get_report(by='fingerprint', sort='total', limit=None):
+    """Сводка всех процессов, по отпечаткам или по парам view и отпечаток.
+
+    Строки отсортированы по убыванию sort и содержат count, total,
+    mean, p95 и max в миллисекундах.
+    """
+    aggregator.flush(force=True)
+    reset_at = cache.get(RESET_KEY, 0)
+    merged = {}
+    for snapshot in get_snapshots():
+        if snapshot['started'] < reset_at:
+            continue
+        for (view, sql_id), stat in snapshot['stats'].items():
+            key = sql_id if by == 'fingerprint' else (view, sql_id)
+            if key not in merged:
+                merged[key] = new_stat(
+                    None if by == 'fingerprint' else view, stat['sql']
+                )
+            merge(merged[key], stat)
+    rows = []
+    for stat in merged.values():
+        stat['mean'] = stat['total'] / stat['count']
+        stat['p95'] = percentile(
+            stat['histogram'], stat['count'], stat['max']
+        )
+        rows.append(stat)
+    rows.sort(key=lambda row: row[sort], reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    """Обнуляет сводку во всех процессах.
+
+    Процессы сбрасывают накопленное при следующей выгрузке, а до тех пор
+    get_report пропускает их сводки, начатые раньше сброса.
+    """
+    cache.set(RESET_KEY, time.time(), None)
+    aggregator.flush(force=True)
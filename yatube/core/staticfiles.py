@@ -0,0 +1,158 @@
+"""Статика для продакшена: имена с хешем и заранее сжатые копии."""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Текстовые форматы, которые имеет смысл сжимать.
+COMPRESSIBLE = (
+    '.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.ico',
+)
+# Сжатая копия нужна, только если она заметно меньше оригинала.
+MIN_RATIO = 0.95
+# Порядок — предпочтение при выборе: brotli сжимает лучше.
+ENCODINGS = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+# Имя с хешем от ManifestStaticFilesStorage: style.0123456789ab.css.
+HASHED = re.compile(r'\.[0-9a-f]{12}\.[^.]+$')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def compress(content):
+    """Сжатые варианты content: {кодировка: байты}."""
+    variants = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Имена с хешем содержимого и рядом .gz и .br (если есть brotli).
+
+    Сжатие делается один раз в collectstatic; отдаёт копии
+    core.middleware.StaticFilesMiddleware.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            with self.open(name) as original:
+                content = original.read()
+            for encoding, data in compress(content).items():
+                if len(data) > len(content) * MIN_RATIO:
+                    continue
+                compressed = name + ENCODINGS[encoding]
+                if self.exists(compressed):
+                    self.delete(compressed)
+                self._save(compressed, ContentFile(data))
+                yield name, compressed, True
+
+
+class StaticFile:
+    """Файл из STATIC_ROOT со сжатыми копиями и заголовками кеширования."""
+
+    def __init__(self, path):
+        self.path = path
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        self.variants = {
+            encoding: path + suffix
+            for encoding, suffix in ENCODINGS.items()
+            if os.path.exists(path + suffix)
+        }
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.last_modified = stat.st_mtime
+        self.immutable = bool(HASHED.search(os.path.basename(path)))
+
+    def choose(self, request):
+        """Лучший вариант, который принимает клиент: (кодировка, путь)."""
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        for encoding, path in self.variants.items():
+            if encoding in accepted:
+                return encoding, path
+        return None, self.path
+
+    def respond(self, request):
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            self.last_modified, self.size,
+        ):
+            response = HttpResponseNotModified()
+        else:
+            encoding, path = self.choose(request)
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=self.content_type)
+                response['Content-Length'] = os.path.getsize(path)
+            else:
+                response = FileResponse(open(path, 'rb'))
+                # FileResponse угадывает тип по имени, а у копии это .gz.
+                response['Content-Type'] = self.content_type
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = http_date(self.last_modified)
+        if self.variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        if self.immutable:
+            patch_cache_control(
+                response, public=True, max_age=IMMUTABLE_MAX_AGE,
+                immutable=True,
+            )
+        else:
+            patch_cache_control(
+                response, public=True, max_age=settings.STATIC_MAX_AGE
+            )
+        return response
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for part in header.split(','):
+        encoding, _, params = part.partition(';')
+        name, _, value = params.partition('=')
+        try:
+            if name.strip() == 'q' and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def find_files(root, url):
+    """Все файлы root, кроме сжатых копий: {адрес: StaticFile}."""
+    files = {}
+    if not root or not os.path.isdir(root):
+        return files
+    suffixes = tuple(ENCODINGS.values())
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(suffixes):
+                continue
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[url + relative] = StaticFile(path)
+    return files
@@ -1,5 +1,7 @@
 from django.shortcuts import render
 
+from .querylog import SORTS, get_report
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -11,3 +13,19 @@ def csrf_failure(request, reason=''):
 
 def server_error(request, reason=''):
     return render(request, 'core/500.html')
+
+
+def query_log(request):
+    """Сводка SQL-запросов для админки; права проверяет admin_view."""
+    by = request.GET.get('by')
+    by = by if by == 'view' else 'fingerprint'
+    sort = request.GET.get('sort')
+    sort = sort if sort in SORTS else 'total'
+    context = {
+        'title': 'Сводка SQL-запросов',
+        'rows': get_report(by, sort, limit=100),
+        'by': by,
+        'sort': sort,
+        'sorts': SORTS,
+    }
+    return render(request, 'core/query_log.html', context)
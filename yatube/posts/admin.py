@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import search_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по поисковому индексу вместо LIKE по тексту."""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_posts(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,234 @@
+import hashlib
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from core.db import router
+
+SITE = 'site'
+SCOPE_KINDS = (SITE, 'feed', 'group', 'profile', 'post')
+CACHED_VIEWS = []
+
+_last_version = 0
+_version_lock = threading.Lock()
+
+
+def version_key(scope):
+    return f'posts:version:{scope}'
+
+
+def new_version():
+    """Время изменения, строго больше прошлой версии этого процесса."""
+    global _last_version
+    with _version_lock:
+        _last_version = max(time.time(), _last_version + 1e-6)
+        return _last_version
+
+
+def version_timeout():
+    """Сколько хранить версии областей; None — пока их не сменят.
+
+    Кеш в памяти процесса другие процессы не сбрасывают: там версии
+    живут не дольше страниц, и устаревшая страница пропадёт сама.
+    """
+    if settings.CACHE_PROCESS_LOCAL:
+        return settings.PAGE_CACHE_TIMEOUT
+    return None
+
+
+def get_versions(scopes):
+    """Текущие версии областей данных одним обращением к кешу."""
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, version_timeout())
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(scopes):
+    version = new_version()
+    cache.set_many(
+        {version_key(scope): version for scope in scopes}, version_timeout()
+    )
+
+
+def invalidate(*scopes):
+    """Сбрасывает все страницы, построенные по данным из scopes.
+
+    Версии меняются сразу — сама транзакция и тесты, которые её
+    не коммитят, видят новые страницы — и ещё раз после коммита:
+    страница, которую параллельный запрос успел собрать из старых данных
+    под промежуточной версией, больше не найдётся.
+    """
+    scopes = set(scopes)
+    bump(scopes)
+
+    def committed():
+        bump(scopes)
+        for scope in scopes:
+            count('invalidations', scope.split(':')[0])
+    transaction.on_commit(committed)
+
+
+def count(event, name):
+    """Увеличивает счётчик статистики кеша, общий для всех процессов."""
+    key = f'posts:stats:{event}:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_stats():
+    """Статистика {(событие, имя): значение} для операторов."""
+    names = [('hits', view) for view in CACHED_VIEWS]
+    names += [('misses', view) for view in CACHED_VIEWS]
+    names += [('invalidations', kind) for kind in SCOPE_KINDS]
+    values = cache.get_many(
+        [f'posts:stats:{event}:{name}' for event, name in names]
+    )
+    return {
+        (event, name): values.get(f'posts:stats:{event}:{name}', 0)
+        for event, name in names
+    }
+
+
+def depend_on(request, *scopes):
+    """Отмечает, что кешируемая страница зависит ещё и от scopes."""
+    if hasattr(request, 'cache_depends') and scopes:
+        request.cache_depends.update(zip(scopes, get_versions(scopes)))
+
+
+def get_variant(request, csrf):
+    """Часть ключа, зависящая от посетителя; None — не кешировать."""
+    if not request.user.is_authenticated:
+        return 'anonymous'
+    if not csrf:
+        return str(request.user.pk)
+    token = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    return f'{request.user.pk}:{token}' if token else None
+
+
+def page_key(name, request, variant, versions):
+    raw = '|'.join(
+        [request.get_full_path(), variant] + [str(v) for v in versions]
+    )
+    return f'posts:page:{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def page_etag(key, depends):
+    """ETag страницы: ключ кеша уже содержит версии её областей."""
+    raw = '|'.join([key] + [str(v) for v in depends.values()])
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def last_modified(versions):
+    """Время изменения страницы для Last-Modified или None.
+
+    Версия области — время её последнего изменения, поэтому страница
+    не менялась с самой поздней из них. HTTP-дата точна до секунды:
+    пока эта секунда не кончилась, новая запись не сдвинет дату,
+    и If-Modified-Since ответил бы 304 на изменившуюся страницу.
+    """
+    newest = max(versions)
+    if time.time() < math.floor(newest) + 1:
+        return None
+    return int(newest)
+
+
+def set_validators(response, etag, modified, private):
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    patch_cache_control(response, no_cache=True)
+    if private:
+        patch_cache_control(response, private=True)
+
+
+def conditional(request, response):
+    """304 Not Modified, если у клиента уже есть эта версия страницы."""
+    return get_conditional_response(
+        request,
+        etag=response['ETag'],
+        last_modified=parse_http_date_safe(response.get('Last-Modified')),
+        response=response,
+    )
+
+
+def cached_view(*scopes, csrf=False, depends=False, timeout=None):
+    """Кеширует страницу до изменения данных из областей scopes.
+
+    Области форматируются аргументами view: 'group:{slug}'. Страницы
+    с формами (csrf=True) кешируются отдельно для каждого CSRF-токена.
+    Версии областей дают ETag и Last-Modified, так что на условный
+    запрос к неизменившейся странице отвечаем 304, не вызывая view
+    и не читая кеш. View, которые вызывают depend_on, объявляются
+    с depends=True: их ETag известен только после сборки страницы.
+    Страница для кеша собирается из основной базы, а не из реплик
+    и хранится timeout секунд, по умолчанию PAGE_CACHE_TIMEOUT.
+    """
+    def decorator(view):
+        CACHED_VIEWS.append(view.__name__)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            variant = get_variant(request, csrf)
+            if request.method not in ('GET', 'HEAD') or variant is None:
+                return view(request, *args, **kwargs)
+            names = [SITE] + [scope.format(**kwargs) for scope in scopes]
+            versions = get_versions(names)
+            key = page_key(view.__name__, request, variant, versions)
+            private = variant != 'anonymous'
+            if not depends:
+                etag = page_etag(key, {})
+                modified = last_modified(versions)
+                not_modified = get_conditional_response(
+                    request, etag=etag, last_modified=modified
+                )
+                if not_modified is not None:
+                    count('hits', view.__name__)
+                    patch_vary_headers(not_modified, ('Cookie',))
+                    set_validators(not_modified, etag, modified, private)
+                    return not_modified
+            entry = cache.get(key)
+            if entry is not None:
+                response, page_depends = entry
+                if not page_depends or get_versions(page_depends) == list(
+                    page_depends.values()
+                ):
+                    count('hits', view.__name__)
+                    return conditional(request, response)
+            count('misses', view.__name__)
+            request.cache_depends = {}
+            # Страница ляжет в кеш под текущими версиями, а реплика
+            # может ещё не догнать записи, которые их сменили.
+            with router.primary():
+                response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if response.status_code == 200 and not response.streaming:
+                page_depends = request.cache_depends
+                set_validators(
+                    response, page_etag(key, page_depends),
+                    last_modified(versions + list(page_depends.values())),
+                    private,
+                )
+                cache.set(
+                    key, (response, page_depends),
+                    settings.PAGE_CACHE_TIMEOUT if timeout is None
+                    else timeout,
+                )
+                return conditional(request, response)
+            return response
+        return wrapper
+    return decorator
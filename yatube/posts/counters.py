@@ -0,0 +1,93 @@
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+BATCH_SIZE = 1000
+
+
+def shift(queryset, **deltas):
+    """Сдвигает счётчики одним UPDATE, не опуская их ниже нуля."""
+    return queryset.update(**{
+        name: Greatest(F(name) + delta, 0)
+        for name, delta in deltas.items()
+    })
+
+
+def shift_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя, при росте создавая их строку."""
+    counters = UserCounters.objects.filter(user_id=user_id)
+    updated = shift(counters, **deltas)
+    if not updated and max(deltas.values()) > 0:
+        UserCounters.objects.get_or_create(user_id=user_id)
+        shift(counters, **deltas)
+
+
+def shift_group(group_id, delta):
+    if group_id is not None:
+        shift(Group.objects.filter(pk=group_id), posts_count=delta)
+
+
+def count_by(queryset, field):
+    return dict(
+        queryset.order_by().values_list(field).annotate(Count('pk'))
+    )
+
+
+def fix_drift(queryset, actual, dry_run=False):
+    """Сверяет счётчики с actual {поле: {pk: значение}}.
+
+    Возвращает число расхождений по каждому полю.
+    """
+    fields = list(actual)
+    drift = dict.fromkeys(fields, 0)
+    changed = []
+    for obj in queryset.only('pk', *fields).iterator(chunk_size=BATCH_SIZE):
+        dirty = False
+        for field in fields:
+            value = actual[field].get(obj.pk, 0)
+            if getattr(obj, field) != value:
+                setattr(obj, field, value)
+                drift[field] += 1
+                dirty = True
+        if dirty:
+            changed.append(obj)
+    if changed and not dry_run:
+        queryset.model.objects.bulk_update(
+            changed, fields, batch_size=BATCH_SIZE
+        )
+    return drift
+
+
+def reconcile(dry_run=False):
+    """Пересчитывает все счётчики по данным таблиц.
+
+    Возвращает отчёт {(модель, поле): число расхождений}.
+    """
+    missing = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True
+    )
+    report = {('UserCounters', 'missing'): missing.count()}
+    if not dry_run:
+        UserCounters.objects.bulk_create(
+            (UserCounters(user_id=pk) for pk in missing.iterator()),
+            batch_size=BATCH_SIZE,
+        )
+    checks = (
+        (UserCounters.objects.all(), {
+            'posts_count': count_by(Post.objects, 'author'),
+            'followers_count': count_by(Follow.objects, 'author'),
+            'following_count': count_by(Follow.objects, 'user'),
+        }),
+        (Group.objects.all(), {
+            'posts_count': count_by(Post.objects, 'group'),
+        }),
+        (Post.objects.all(), {
+            'comments_count': count_by(Comment.objects, 'post'),
+        }),
+    )
+    for queryset, actual in checks:
+        drift = fix_drift(queryset, actual, dry_run)
+        for field, value in drift.items():
+            report[(queryset.model.__name__, field)] = value
+    return report
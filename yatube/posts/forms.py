@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Post, Comment
 
 
@@ -13,6 +15,21 @@ class PostForm(forms.ModelForm):
             'image': 'Изображение'
         }
 
+    def clean_image(self):
+        """Новое изображение уменьшается и пережимается до сохранения."""
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            processed = images.process(image)
+            self.instance.image_width = processed.width
+            self.instance.image_height = processed.height
+            self.instance.image_variants = ' '.join(processed.variants)
+            self.instance._pending_variants = processed.variants
+            return processed.file
+        if not image:
+            self.instance.image_width = self.instance.image_height = None
+            self.instance.image_variants = ''
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,106 @@
+import os
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+MAX_SOURCE_PIXELS = 50_000_000
+MIN_SIDE = 16
+KEPT_INFO = ('icc_profile', 'transparency')
+VARIANTS = {
+    'webp': lambda: features.check('webp'),
+    'avif': lambda: 'AVIF' in Image.SAVE,
+}
+
+ProcessedImage = namedtuple(
+    'ProcessedImage', ('file', 'width', 'height', 'variants')
+)
+
+
+def variant_name(name, extension):
+    """Имя файла с тем же изображением в другом формате."""
+    return f'{os.path.splitext(name)[0]}.{extension}'
+
+
+def get_variant_formats():
+    return [extension for extension, check in VARIANTS.items() if check()]
+
+
+def validate(image):
+    width, height = image.size
+    if width * height > MAX_SOURCE_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: не больше %(pixels)s пикселей.',
+            params={'pixels': MAX_SOURCE_PIXELS},
+        )
+    if min(width, height) < MIN_SIDE:
+        raise ValidationError(
+            'Изображение слишком маленькое: от %(side)s пикселей по стороне.',
+            params={'side': MIN_SIDE},
+        )
+
+
+def encode(image, image_format):
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        quality=settings.POST_IMAGE_QUALITY,
+        optimize=True,
+        progressive=True,
+    )
+    return buffer.getvalue()
+
+
+def process(upload):
+    """Проверяет загруженное изображение и готовит его к хранению.
+
+    Уменьшает до POST_IMAGE_MAX_SIDE, поворачивает по EXIF и удаляет
+    метаданные, пережимает и строит варианты в WebP и AVIF, если Pillow
+    их поддерживает. Анимации сохраняются как есть. Файл, который
+    не удаётся декодировать до конца, даёт ValidationError.
+    """
+    try:
+        return transform(upload)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Изображение повреждено: его не удалось прочитать целиком.'
+        )
+
+
+def transform(upload):
+    upload.seek(0)
+    image = Image.open(upload)
+    validate(image)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        original = ContentFile(upload.read(), name=upload.name)
+        original.sha256 = getattr(upload, 'sha256', None)
+        return ProcessedImage(original, *image.size, {})
+    lossless = image.format in ('PNG', 'GIF') or 'A' in image.getbands()
+    image = ImageOps.exif_transpose(image)
+    image.info = {
+        key: value for key, value in image.info.items() if key in KEPT_INFO
+    }
+    if lossless:
+        image_format, extension = 'PNG', 'png'
+    else:
+        image_format, extension = 'JPEG', 'jpg'
+        image = image.convert('RGB')
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    variants = {
+        variant: encode(image, variant.upper())
+        for variant in get_variant_formats()
+    }
+    return ProcessedImage(
+        ContentFile(
+            encode(image, image_format),
+            name=variant_name(os.path.basename(upload.name), extension),
+        ),
+        *image.size,
+        variants,
+    )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.urls import get_resolver
+
+from posts.caching import CACHED_VIEWS, SCOPE_KINDS, get_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, промахи и сбросы кеша страниц сайта и API.'
+
+    def handle(self, *args, **options):
+        # Кешируемые view регистрируются при импорте своих модулей:
+        # загружаем все URLconf, чтобы попали и страницы API.
+        get_resolver().url_patterns
+        stats = get_stats()
+        for view in CACHED_VIEWS:
+            hits = stats[('hits', view)]
+            misses = stats[('misses', view)]
+            total = hits + misses
+            ratio = hits / total * 100 if total else 0
+            self.stdout.write(
+                f'{view}: попаданий {hits}, промахов {misses} ({ratio:.1f}%)'
+            )
+        for kind in SCOPE_KINDS:
+            self.stdout.write(
+                f'сбросов {kind}: {stats[("invalidations", kind)]}'
+            )
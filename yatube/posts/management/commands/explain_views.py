@@ -0,0 +1,112 @@
+import re
+from inspect import unwrap
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from posts import views
+from posts.models import Group, Post, User
+
+STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+WARNINGS = (
+    (re.compile(r'\bSCAN (TABLE )?\S+$'), 'полное сканирование таблицы'),
+    (re.compile(r'\bSeq Scan\b'), 'полное сканирование таблицы'),
+    (re.compile(r'TEMP B-TREE'), 'сортировка во временном B-дереве'),
+    (re.compile(r'^(->\s*)?Sort\b'), 'сортировка без индекса'),
+)
+
+
+def explain(sql, params):
+    """Возвращает строки плана запроса для текущей СУБД."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else (
+        'EXPLAIN '
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [str(row[-1]).strip() for row in cursor.fetchall()]
+
+
+def get_warnings(line):
+    return [text for pattern, text in WARNINGS if pattern.search(line)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Повторяет запросы view-функций posts и выводит их планы, '
+        'отмечая полные сканирования и сортировки без индекса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sql', action='store_true', help='Печатать текст запросов.'
+        )
+
+    def get_cases(self):
+        post = Post.objects.select_related('author').first()
+        if post is None:
+            raise CommandError('В базе нет постов для проверки запросов.')
+        group = Group.objects.filter(posts__isnull=False).first()
+        other = User.objects.exclude(id=post.author_id).first() or post.author
+        cases = [
+            ('index', 'get', {}, None),
+            ('profile', 'get', {'username': post.author.username}, None),
+            ('post_detail', 'get', {'post_id': post.id}, None),
+            ('post_create', 'get', {}, None),
+            ('post_edit', 'get', {'post_id': post.id}, None),
+            ('add_comment', 'post', {'post_id': post.id}, {'text': 'explain'}),
+            ('follow_index', 'get', {}, None),
+            ('search', 'get', {}, {'q': post.text[:20]}),
+            ('profile_follow', 'get', {'username': other.username}, None),
+            ('profile_unfollow', 'get', {'username': other.username}, None),
+        ]
+        if group is not None:
+            cases.insert(1, ('group_posts', 'get', {'slug': group.slug}, None))
+        return post.author, cases
+
+    def capture(self, user, name, method, kwargs, data):
+        """Выполняет view и откатывает все сделанные им изменения."""
+        queries = []
+
+        def collect(execute, sql, params, many, context):
+            if not many:
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        request = getattr(RequestFactory(), method)('/', data or {})
+        request.user = user
+        view = unwrap(getattr(views, name))
+        with transaction.atomic():
+            with connection.execute_wrapper(collect):
+                view(request, **kwargs)
+            plans = [
+                (sql, explain(sql, params)) for sql, params in queries
+                if sql.lstrip().upper().startswith(STATEMENTS)
+            ]
+            transaction.set_rollback(True)
+        return plans
+
+    def handle(self, *args, **options):
+        user, cases = self.get_cases()
+        flagged = 0
+        for name, method, kwargs, data in cases:
+            plans = self.capture(user, name, method, kwargs, data)
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(f'{name}: {len(plans)} запросов')
+            )
+            for number, (sql, plan) in enumerate(plans, 1):
+                self.stdout.write(f'  [{number}] {sql[:70]}')
+                if options['sql']:
+                    self.stdout.write(f'      {sql}')
+                for line in plan:
+                    warnings = get_warnings(line)
+                    if not warnings:
+                        self.stdout.write(f'      {line}')
+                        continue
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'    ! {line} ({", ".join(warnings)})'
+                    ))
+        summary = f'Подозрительных шагов плана: {flagged}'
+        style = self.style.WARNING if flagged else self.style.SUCCESS
+        self.stdout.write(style(summary))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (
+    FORMATS, KINDS, export_rows, guess_format, write_rows
+)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в JSONL или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path', help='Файл или «-» для stdout.')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='По умолчанию по расширению файла, иначе jsonl.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        columns = KINDS[options['kind']].columns
+        rows = export_rows(options['kind'])
+        started = time.monotonic()
+        if path == '-':
+            written = write_rows(rows, self.stdout, file_format, columns)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                written = write_rows(rows, stream, file_format, columns)
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено строк: {written} за {elapsed:.1f} с '
+            f'({written / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
@@ -0,0 +1,119 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from core.db import router
+from posts.models import Post
+from posts.storage import content_storage, delete_original, is_hashed
+
+ORIGINALS_DIR = 'posts'
+
+
+def walk(storage, path):
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield f'{path}/{name}'
+    for directory in directories:
+        yield from walk(storage, f'{path}/{directory}')
+
+
+def get_thumbnail_names(kvstore):
+    """Имена всех миниатюр, которые помнит KV store sorl."""
+    names = set()
+    for key in kvstore._find_keys(identity='thumbnails'):
+        for thumbnail_key in kvstore._get(key, identity='thumbnails') or []:
+            thumbnail = kvstore._get(thumbnail_key)
+            if thumbnail:
+                names.add(thumbnail.name)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из media/ картинки с именами по хешу, на которые '
+        'не ссылается ни один пост, и миниатюры, о которых не помнит sorl.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд '
+                 '(загрузки, ещё не попавшие в базу).',
+        )
+
+    def is_old(self, name):
+        return content_storage.get_modified_time(name) < self.cutoff
+
+    def collect(self, names, remove):
+        # Время изменения проверяется ещё раз: файл могли загрузить снова,
+        # пока обходили каталог.
+        names = [name for name in names if self.is_old(name)]
+        freed = sum(content_storage.size(name) for name in names)
+        if not self.dry_run:
+            for name in names:
+                remove(name)
+        return len(names), freed
+
+    def get_orphans(self):
+        """Картинки с именами по хешу, на которые не ссылается ни один пост.
+
+        Вариант в другом формате называется как оригинал и остаётся, пока
+        жив хоть один файл с тем же хешем. Имена не по хешу остались
+        от старых загрузок: их сборщик не трогает.
+        """
+        with router.primary():
+            referenced = set(
+                Post.objects.exclude(image='').exclude(image=None)
+                .values_list('image', flat=True)
+            )
+        names = [
+            name for name in walk(content_storage, ORIGINALS_DIR)
+            if is_hashed(name)
+        ]
+        unused = {
+            name for name in names
+            if name not in referenced and self.is_old(name)
+        }
+        alive = {
+            os.path.splitext(name)[0] for name in names if name not in unused
+        }
+        return sorted(
+            name for name in unused
+            if os.path.splitext(name)[0] not in alive
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        originals = self.get_orphans()
+        report = [('Оригиналов', self.collect(originals, delete_original))]
+        if not self.dry_run:
+            default.kvstore.cleanup()
+        thumbnails = get_thumbnail_names(default.kvstore)
+        prefix = os.path.normpath(sorl_settings.THUMBNAIL_PREFIX)
+        stale = [
+            name for name in walk(content_storage, prefix)
+            if name not in thumbnails and self.is_old(name)
+        ]
+        report.append(
+            ('Миниатюр', self.collect(stale, content_storage.delete))
+        )
+        verb = 'к удалению' if self.dry_run else 'удалено'
+        for title, (count, freed) in report:
+            self.stdout.write(
+                f'{title} {verb}: {count} ({filesizeformat(freed)})'
+            )
@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.synthetic import ALPHA, Generator
+from posts.transfer import BATCH_SIZE, rebuild_derived
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками со степенным распределением '
+        'популярности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько разных картинок раздать постам.',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.2,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument('--alpha', type=float, default=ALPHA)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def step(self, title, action):
+        started = time.monotonic()
+        result = action()
+        count = result if isinstance(result, int) else len(result)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{title}: {count} за {elapsed:.1f} с '
+            f'({count / max(elapsed, 1e-6):.0f} строк/с)'
+        )
+        return result
+
+    def handle(self, *args, **options):
+        generator = Generator(
+            options['seed'], options['alpha'], options['batch_size']
+        )
+        user_ids = self.step(
+            'Пользователи', lambda: generator.users(options['users'])
+        )
+        group_ids = self.step(
+            'Группы', lambda: generator.groups(options['groups'])
+        )
+        images = self.step(
+            'Картинки', lambda: generator.images(options['images'])
+        )
+        posts = self.step('Посты', lambda: generator.posts(
+            options['posts'], user_ids, group_ids, images,
+            options['image_share'],
+        ))
+        self.step('Комментарии', lambda: generator.comments(
+            options['comments'], user_ids, posts
+        ))
+        self.step('Подписки', lambda: generator.follows(
+            options['follows'], user_ids
+        ))
+        started = time.monotonic()
+        rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики, ленты и поиск пересчитаны за '
+            f'{time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,100 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (
+    BATCH_SIZE, FORMATS, KINDS, Importer, chunked, guess_format, read_rows,
+    rebuild_derived, reset_sequences
+)
+
+PROGRESS_EVERY = 100_000
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из JSONL или CSV '
+        'пачками через bulk_create, затем пересчитывает счётчики, ленты '
+        'и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path', help='Файл или «-» для stdin.')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='По умолчанию по расширению файла, иначе jsonl.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Строк в одной транзакции.',
+        )
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Создавать неизвестных пользователей без пароля.',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересчитывать производные данные, например когда '
+                 'следом загружается ещё один файл.',
+        )
+
+    def load(self, stream, options):
+        importer = Importer(options['kind'], options['create_users'])
+        file_format = options['format'] or guess_format(options['path'])
+        started = time.monotonic()
+        loaded = reported = 0
+        try:
+            for rows in chunked(
+                read_rows(stream, file_format), options['batch_size']
+            ):
+                loaded += importer.save(rows)
+                if loaded - reported >= PROGRESS_EVERY:
+                    reported = loaded
+                    self.report('Загружено', loaded, started)
+        except (KeyError, ValueError) as error:
+            raise CommandError(
+                f'Ошибка в строке после {loaded + importer.skipped}: '
+                f'{error!r}'
+            )
+        self.report('Загружено', loaded, started, self.style.SUCCESS)
+        if importer.skipped:
+            unknown = ', '.join(sorted(map(str, importer.unknown))[:10])
+            self.stderr.write(self.style.WARNING(
+                f'Пропущено строк: {importer.skipped}'
+                + (f'; неизвестные имена: {unknown}' if unknown else '')
+            ))
+        for pk, error in list(importer.rejected.items())[:10]:
+            self.stderr.write(self.style.WARNING(
+                f'Строка с id {pk} отвергнута базой: {error}'
+            ))
+        reset_sequences(importer.model)
+
+    def report(self, action, count, started, style=None):
+        elapsed = time.monotonic() - started
+        line = (
+            f'{action} строк: {count} за {elapsed:.1f} с '
+            f'({count / max(elapsed, 1e-6):.0f} строк/с)'
+        )
+        self.stdout.write(style(line) if style else line)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        if options['path'] == '-':
+            self.load(sys.stdin, options)
+        else:
+            with open(options['path'], encoding='utf-8', newline='') as f:
+                self.load(f, options)
+        if not options['no_rebuild']:
+            started = time.monotonic()
+            rebuild_derived()
+            self.stdout.write(
+                f'Счётчики, ленты и поиск пересчитаны за '
+                f'{time.monotonic() - started:.1f} с'
+            )
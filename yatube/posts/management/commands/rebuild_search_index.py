@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.search import get_index, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс по всем постам.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов проиндексировано: {count} за {elapsed:.1f} с '
+            f'({type(get_index()).__name__})'
+        ))
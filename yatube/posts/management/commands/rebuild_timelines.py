@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново раскладывает посты по лентам подписок. Нужна один раз '
+        'после миграции 0016, которая создаёт пустую таблицу лент, '
+        'и после массовых правок подписок в обход моделей.'
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            count = rebuild()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {count} за {elapsed:.1f} с'
+        ))
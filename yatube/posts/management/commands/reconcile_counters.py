@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, комментариев и подписок '
+        'и сообщает о расхождениях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            report = reconcile(dry_run=options['dry_run'])
+        for (model, field), drift in report.items():
+            line = f'{model}.{field}: расхождений {drift}'
+            style = self.style.WARNING if drift else self.style.SUCCESS
+            self.stdout.write(style(line))
+        if not options['dry_run'] and any(report.values()):
+            self.stdout.write('Счётчики исправлены.')
@@ -0,0 +1,40 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import build, generate
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее строит миниатюры картинок всех постов '
+        'в нескольких потоках.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Число потоков; 1 — строить в текущем потоке.',
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='')
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        started = time.monotonic()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as pool:
+                list(pool.map(build, names))
+        else:
+            for name in names:
+                generate(name)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {len(names)} за {elapsed:.1f} с'
+        ))
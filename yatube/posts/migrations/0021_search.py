@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:17
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_search USING fts5('
+            'text, comments, group_title, '
+            "tokenize='unicode61 remove_diacritics 0', prefix='2 3')"
+        )
+    except OperationalError:
+        # SQLite без FTS5: поиск работает по таблице SearchTerm.
+        pass
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('field', models.PositiveSmallIntegerField(choices=[(0, 'Текст поста'), (1, 'Комментарии'), (2, 'Название группы')], verbose_name='Поле')),
+                ('count', models.PositiveIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Вхождение в поисковый индекс',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'post'], name='search_term_idx'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
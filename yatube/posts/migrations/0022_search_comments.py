@@ -0,0 +1,209 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:05
+
+import re
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TEXT, COMMENTS, GROUP_TITLE = range(3)
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 0', prefix='2 3'"
+
+
+# Копия posts.stemming и posts.search.tokenize на момент миграции:
+# позднейшие правки стеммера не должны менять то, что она запишет.
+VOWELS = 'аеиоуыэюя'
+RV = re.compile(rf'^(.*?[{VOWELS}])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+I_ENDING = re.compile(r'и$')
+DERIVATIONAL = re.compile(rf'.*[^{VOWELS}]+[{VOWELS}].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+SOFT_SIGN = re.compile(r'ь$')
+DOUBLE_N = re.compile(r'нн$')
+
+
+def strip(pattern, word):
+    """Слово без окончания pattern и признак того, что оно было."""
+    stripped = pattern.sub('', word, 1)
+    return stripped, stripped != word
+
+
+def stem(word):
+    """Основа русского слова; прочие слова возвращаются как есть."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    rv, found = strip(PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = strip(REFLEXIVE, rv)
+        rv, found = strip(ADJECTIVE, rv)
+        if found:
+            rv, _ = strip(PARTICIPLE, rv)
+        else:
+            rv, found = strip(VERB, rv)
+            if not found:
+                rv, _ = strip(NOUN, rv)
+    rv, _ = strip(I_ENDING, rv)
+    if DERIVATIONAL.match(rv):
+        rv, _ = strip(DERIVATIONAL_ENDING, rv)
+    rv, found = strip(SOFT_SIGN, rv)
+    if not found:
+        rv, _ = strip(SUPERLATIVE, rv)
+        rv = DOUBLE_N.sub('н', rv, 1)
+    return start + rv
+
+
+MAX_TERM_LENGTH = 64
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Основы слов текста в порядке следования."""
+    return [
+        stem(word)[:MAX_TERM_LENGTH] for word in WORD.findall(text.lower())
+    ]
+
+
+def has_fts_table(schema_editor):
+    connection = schema_editor.connection
+    return (
+        connection.vendor == 'sqlite'
+        and 'posts_search' in connection.introspection.table_names()
+    )
+
+
+def fill_fts_tables(apps, schema_editor, comments_apart):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    posts = Post.objects.values_list('pk', 'text', 'group__title')
+    comments = Comment.objects.values_list('pk', 'post_id', 'text')
+    with schema_editor.connection.cursor() as cursor:
+        if comments_apart:
+            cursor.executemany(
+                'INSERT INTO posts_search (rowid, text, group_title) '
+                'VALUES (%s, %s, %s)',
+                [
+                    [pk, ' '.join(tokenize(text)),
+                     ' '.join(tokenize(title or ''))]
+                    for pk, text, title in posts.iterator()
+                ],
+            )
+            cursor.executemany(
+                'INSERT INTO posts_comment_search (rowid, text, post_id) '
+                'VALUES (%s, %s, %s)',
+                [
+                    [pk, ' '.join(tokenize(text)), post_id]
+                    for pk, post_id, text in comments.iterator()
+                ],
+            )
+            return
+        joined = defaultdict(list)
+        for _, post_id, text in comments.iterator():
+            joined[post_id].append(text)
+        cursor.executemany(
+            'INSERT INTO posts_search (rowid, text, comments, group_title) '
+            'VALUES (%s, %s, %s, %s)',
+            [
+                [pk, ' '.join(tokenize(text)),
+                 ' '.join(tokenize(' '.join(joined[pk]))),
+                 ' '.join(tokenize(title or ''))]
+                for pk, text, title in posts.iterator()
+            ],
+        )
+
+
+def index_comments_apart(apps, schema_editor):
+    """Каждый комментарий — отдельный документ индекса."""
+    if has_fts_table(schema_editor):
+        schema_editor.execute('DROP TABLE posts_search')
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE posts_search USING fts5('
+            f'text, group_title, {FTS_OPTIONS})'
+        )
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE posts_comment_search USING fts5('
+            f'text, post_id UNINDEXED, {FTS_OPTIONS})'
+        )
+        fill_fts_tables(apps, schema_editor, comments_apart=True)
+        return
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchTerm.objects.filter(field=COMMENTS).delete()
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(
+                term=term, post_id=post_id, comment_id=pk, field=COMMENTS,
+                count=count,
+            )
+            for pk, post_id, text in Comment.objects.values_list(
+                'pk', 'post_id', 'text'
+            ).iterator()
+            for term, count in Counter(tokenize(text)).items()
+        ),
+        batch_size=500,
+    )
+
+
+def index_comments_joined(apps, schema_editor):
+    """Комментарии поста — одно поле его документа, как раньше."""
+    if has_fts_table(schema_editor):
+        schema_editor.execute('DROP TABLE posts_search')
+        schema_editor.execute('DROP TABLE IF EXISTS posts_comment_search')
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE posts_search USING fts5('
+            f'text, comments, group_title, {FTS_OPTIONS})'
+        )
+        fill_fts_tables(apps, schema_editor, comments_apart=False)
+        return
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchTerm.objects.filter(field=COMMENTS).delete()
+    counts = defaultdict(Counter)
+    for post_id, text in Comment.objects.values_list(
+        'post_id', 'text'
+    ).iterator():
+        counts[post_id].update(tokenize(text))
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(term=term, post_id=post_id, field=COMMENTS, count=count)
+            for post_id, terms in counts.items()
+            for term, count in terms.items()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchterm',
+            name='comment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Comment', verbose_name='Комментарий'),
+        ),
+        migrations.RunPython(index_comments_apart, index_comments_joined),
+    ]
@@ -1,19 +1,43 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
+from .images import variant_name
+from .storage import content_storage
+
 User = get_user_model()
 
 
+class CountedModel(models.Model):
+    """Модель, чьё сохранение меняет счётчики в той же транзакции.
+
+    Счётчики обновляются обработчиками post_save, которые Django
+    вызывает уже после записи строки, поэтому save() оборачивается
+    в транзакцию целиком.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов',
+    )
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class Post(CountedModel):
     text = models.TextField(help_text='Текст нового поста')
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
@@ -31,19 +55,63 @@ class Post(models.Model):
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=content_storage,
         blank=True,
         null=True,
         help_text='Можете загрузить изображение',
     )
+    image_width = models.PositiveIntegerField(
+        null=True,
+        editable=False,
+        verbose_name='Ширина изображения',
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        editable=False,
+        verbose_name='Высота изображения',
+    )
+    image_variants = models.CharField(
+        max_length=20,
+        blank=True,
+        editable=False,
+        verbose_name='Другие форматы изображения',
+        help_text='Расширения через пробел, например «webp avif»',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев',
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['pub_date', 'id'], name='post_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def image_sources(self):
+        """Варианты изображения для <source> внутри <picture>."""
+        return [
+            {
+                'url': self.image.storage.url(
+                    variant_name(self.image.name, extension)
+                ),
+                'type': f'image/{extension}',
+            }
+            for extension in self.image_variants.split()
+        ]
+
 
-class Comment(models.Model):
+class Comment(CountedModel):
     text = models.TextField(
         verbose_name='Текст комментария',
     )
@@ -68,9 +136,14 @@ class Comment(models.Model):
 
     class Meta:
         verbose_name = 'Comment'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'),
+        ]
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -90,3 +163,111 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name='unique_subs')
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'),
+        ]
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='counters',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок',
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Владелец ленты',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='timeline_user_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_post')
+        ]
+
+
+class SearchTerm(models.Model):
+    """Основа слова поста или комментария: индекс для поиска без FTS5."""
+
+    TEXT, COMMENTS, GROUP_TITLE = range(3)
+    FIELD_CHOICES = (
+        (TEXT, 'Текст поста'),
+        (COMMENTS, 'Комментарии'),
+        (GROUP_TITLE, 'Название группы'),
+    )
+
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Основа слова',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Комментарий',
+    )
+    field = models.PositiveSmallIntegerField(
+        choices=FIELD_CHOICES,
+        verbose_name='Поле',
+    )
+    count = models.PositiveIntegerField(
+        verbose_name='Число вхождений',
+    )
+
+    class Meta:
+        verbose_name = 'Вхождение в поисковый индекс'
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_idx'),
+        ]
@@ -0,0 +1,324 @@
+import math
+import re
+from collections import Counter
+from functools import reduce
+from operator import add
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import (
+    Case, ExpressionWrapper, F, FloatField, IntegerField, Max, Q, Sum, Value,
+    When
+)
+from django.db.models.functions import Round
+
+from .models import Comment, Post, SearchTerm
+from .stemming import stem
+
+SEARCH_LIMIT = 1000
+BATCH_SIZE = 500
+FTS_TABLE = 'posts_search'
+FTS_COMMENTS_TABLE = 'posts_comment_search'
+# Поля документа поста и вес совпадения в каждом из них.
+FIELDS = ('text', 'group_title')
+WEIGHTS = {
+    SearchTerm.TEXT: 10.0,
+    SearchTerm.COMMENTS: 2.0,
+    SearchTerm.GROUP_TITLE: 5.0,
+}
+MAX_TERM_LENGTH = 64
+BM25_K1 = 1.2
+# Релевантность хранится в курсоре целым числом: дробные суммы
+# от запроса к запросу могут разойтись в последнем знаке.
+SCORE_SCALE = 10 ** 6
+# Сколько секунд PythonIndex помнит число постов для IDF.
+TOTAL_TIMEOUT = 60 * 5
+WORD = re.compile(r'\w+')
+
+_index = None
+
+
+def tokenize(text):
+    """Основы слов текста в порядке следования."""
+    return [
+        stem(word)[:MAX_TERM_LENGTH] for word in WORD.findall(text.lower())
+    ]
+
+
+def get_documents(post_ids):
+    """Поля поисковых документов постов: {id: (текст, название группы)}."""
+    return {
+        pk: (text, group_title or '')
+        for pk, text, group_title in Post.objects.filter(
+            pk__in=post_ids
+        ).values_list('pk', 'text', 'group__title')
+    }
+
+
+class Fts5Index:
+    """Таблицы SQLite FTS5 над основами слов, ранжирование bm25.
+
+    Пост и каждый его комментарий — отдельные документы: новый
+    комментарий добавляет в индекс одну строку.
+    """
+
+    def update(self, documents):
+        columns = ', '.join(FIELDS)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, {columns}) '
+                f'VALUES (%s, %s, %s)',
+                [
+                    [pk] + [' '.join(tokenize(field)) for field in fields]
+                    for pk, fields in documents.items()
+                ],
+            )
+
+    def update_comments(self, comments):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {FTS_COMMENTS_TABLE} '
+                f'(rowid, text, post_id) VALUES (%s, %s, %s)',
+                [
+                    [pk, ' '.join(tokenize(text)), post_id]
+                    for pk, (post_id, text) in comments.items()
+                ],
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [[pk] for pk in post_ids],
+            )
+            cursor.executemany(
+                f'DELETE FROM {FTS_COMMENTS_TABLE} WHERE post_id = %s',
+                [[pk] for pk in post_ids],
+            )
+
+    def remove_comments(self, comment_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_COMMENTS_TABLE} WHERE rowid = %s',
+                [[pk] for pk in comment_ids],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(f'DELETE FROM {FTS_COMMENTS_TABLE}')
+
+    def search(self, terms, limit, after=None, backwards=False):
+        post_weights = ', '.join(
+            str(WEIGHTS[field])
+            for field in (SearchTerm.TEXT, SearchTerm.GROUP_TITLE)
+        )
+        comment_weight = WEIGHTS[SearchTerm.COMMENTS]
+        hits, params, keyset = [], [], ''
+        for number, term in enumerate(terms):
+            hits += [
+                f'SELECT rowid AS post_id, {number} AS term, '
+                f'-bm25({FTS_TABLE}, {post_weights}) AS score '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                f'SELECT post_id, {number}, '
+                f'-{comment_weight} * bm25({FTS_COMMENTS_TABLE}, 1.0, 0.0) '
+                f'FROM {FTS_COMMENTS_TABLE} '
+                f'WHERE {FTS_COMMENTS_TABLE} MATCH %s',
+            ]
+            params += [f'"{term}"*'] * 2
+        params.append(len(terms))
+        if after is not None:
+            lookup = '>' if backwards else '<'
+            keyset = (
+                f'AND (relevance {lookup} %s '
+                f'OR (relevance = %s AND post_id {lookup} %s))'
+            )
+            params += [after[0], after[0], after[1]]
+        params.append(limit)
+        order = 'ASC' if backwards else 'DESC'
+        with connection.cursor() as cursor:
+            # Пост должен содержать все слова запроса — в тексте,
+            # названии группы или комментариях.
+            cursor.execute(
+                f'SELECT post_id, CAST(ROUND(SUM(score) * {SCORE_SCALE}) '
+                f'AS INTEGER) AS relevance '
+                f'FROM ({" UNION ALL ".join(hits)}) '
+                f'GROUP BY post_id HAVING COUNT(DISTINCT term) = %s '
+                f'{keyset} ORDER BY relevance {order}, post_id {order} '
+                f'LIMIT %s',
+                params,
+            )
+            return [tuple(row) for row in cursor.fetchall()]
+
+
+class PythonIndex:
+    """Обратный индекс в таблице SearchTerm, ранжирование BM25 в SQL.
+
+    Работает на любой СУБД; на SQLite с FTS5 используется Fts5Index.
+    Вхождения из комментариев хранятся отдельно по каждому комментарию.
+    """
+
+    def update(self, documents):
+        SearchTerm.objects.filter(
+            post_id__in=list(documents), comment=None
+        ).delete()
+        fields = (SearchTerm.TEXT, SearchTerm.GROUP_TITLE)
+        SearchTerm.objects.bulk_create(
+            [
+                SearchTerm(term=term, post_id=pk, field=field, count=count)
+                for pk, texts in documents.items()
+                for field, text in zip(fields, texts)
+                for term, count in Counter(tokenize(text)).items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    def update_comments(self, comments):
+        self.remove_comments(list(comments))
+        SearchTerm.objects.bulk_create(
+            [
+                SearchTerm(
+                    term=term, post_id=post_id, comment_id=pk,
+                    field=SearchTerm.COMMENTS, count=count,
+                )
+                for pk, (post_id, text) in comments.items()
+                for term, count in Counter(tokenize(text)).items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    def remove(self, post_ids):
+        SearchTerm.objects.filter(post_id__in=post_ids).delete()
+
+    def remove_comments(self, comment_ids):
+        SearchTerm.objects.filter(comment_id__in=comment_ids).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def get_total(self):
+        return cache.get_or_set(
+            'posts:search:total', Post.objects.count, TOTAL_TIMEOUT
+        )
+
+    def search(self, terms, limit, after=None, backwards=False):
+        total = self.get_total()
+        saturation = ExpressionWrapper(
+            Case(
+                *(When(field=field, then=Value(weight))
+                  for field, weight in WEIGHTS.items()),
+                output_field=FloatField(),
+            ) * F('count') / (F('count') + Value(BM25_K1)),
+            output_field=FloatField(),
+        )
+        matched, scores = [], []
+        for term in terms:
+            prefix = Q(term__startswith=term)
+            found = SearchTerm.objects.filter(prefix).values(
+                'post_id'
+            ).distinct().count()
+            idf = math.log(1 + (total - found + 0.5) / (found + 0.5))
+            matched.append(Max(Case(
+                When(prefix, then=Value(1)), default=Value(0),
+                output_field=IntegerField(),
+            )))
+            scores.append(Sum(Case(
+                When(prefix, then=saturation * Value(idf)),
+                default=Value(0.0), output_field=FloatField(),
+            )))
+        hits = SearchTerm.objects.filter(
+            reduce(lambda left, right: left | right, (
+                Q(term__startswith=term) for term in terms
+            ))
+        ).values('post_id').annotate(
+            matched=reduce(add, matched),
+            relevance=Round(reduce(add, scores) * Value(SCORE_SCALE)),
+        ).filter(matched=len(terms))
+        if after is not None:
+            lookup = 'gt' if backwards else 'lt'
+            hits = hits.filter(
+                Q(**{f'relevance__{lookup}': after[0]})
+                | Q(relevance=after[0], **{f'post_id__{lookup}': after[1]})
+            )
+        order = ('relevance', 'post_id') if backwards else (
+            '-relevance', '-post_id'
+        )
+        return [
+            (post_id, int(relevance))
+            for post_id, relevance in hits.order_by(*order).values_list(
+                'post_id', 'relevance'
+            )[:limit]
+        ]
+
+
+def get_index():
+    global _index
+    if _index is None:
+        fts5 = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+        _index = Fts5Index() if fts5 else PythonIndex()
+    return _index
+
+
+def index_posts(post_ids):
+    """Переиндексирует посты; удалённые пропадают из индекса."""
+    post_ids = list(post_ids)
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        batch = post_ids[start:start + BATCH_SIZE]
+        documents = get_documents(batch)
+        missing = set(batch) - set(documents)
+        if missing:
+            get_index().remove(list(missing))
+        if documents:
+            get_index().update(documents)
+
+
+def index_comments(comments):
+    """Добавляет комментарии в индекс отдельными документами."""
+    get_index().update_comments({
+        comment.pk: (comment.post_id, comment.text) for comment in comments
+    })
+
+
+def remove_posts(post_ids):
+    get_index().remove(post_ids)
+
+
+def remove_comments(comment_ids):
+    get_index().remove_comments(comment_ids)
+
+
+def rebuild():
+    """Строит индекс заново пачками по BATCH_SIZE документов."""
+    get_index().clear()
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    index_posts(post_ids)
+    comments = Comment.objects.order_by('pk').only('post_id', 'text')
+    batch = []
+    for comment in comments.iterator(chunk_size=BATCH_SIZE):
+        batch.append(comment)
+        if len(batch) == BATCH_SIZE:
+            index_comments(batch)
+            batch = []
+    index_comments(batch)
+    return len(post_ids)
+
+
+def rank_posts(query, limit=SEARCH_LIMIT, after=None, backwards=False):
+    """[(id поста, релевантность)] по запросу, лучшие первыми.
+
+    after — ключ (релевантность, id) последнего поста прошлой страницы:
+    выдача продолжается после него, с backwards — перед ним в обратном
+    порядке.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    return get_index().search(terms, limit, after, backwards)
+
+
+def search_posts(query, limit=SEARCH_LIMIT):
+    """id постов по запросу, лучшие совпадения первыми."""
+    return [pk for pk, _ in rank_posts(query, limit)]
@@ -1,9 +1,214 @@
-from django.core.paginator import Paginator
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import search
+from .caching import SITE, get_versions
+from .models import Post
 
 PAGINATOR_QUANTITY = 10
+COMMENTS_QUANTITY = 20
+COUNT_LIMIT = 1000
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, value, pk, number):
+    """Упаковывает позицию в непрозрачный токен для ?cursor=.
+
+    value — значение ключа, уже приведённое к типу JSON.
+    """
+    data = json.dumps([direction, value, pk, number])
+    return urlsafe_base64_encode(data.encode())
+
+
+def decode_cursor(cursor):
+    """Распаковывает токен; для битого токена бросает ValueError."""
+    if not cursor:
+        raise ValueError('Пустой курсор')
+    try:
+        direction, value, pk, number = json.loads(
+            urlsafe_base64_decode(cursor)
+        )
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Некорректный курсор')
+    if (
+        direction not in (NEXT, PREVIOUS)
+        or not isinstance(pk, int) or not isinstance(number, int)
+    ):
+        raise ValueError('Некорректный курсор')
+    return direction, value, pk, number
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (дата, id) без OFFSET и COUNT(*).
+
+    Соседняя страница выбирается условием на ключ крайней записи
+    текущей, поэтому глубокая страница стоит столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, key='-pub_date',
+                 count_limit=COUNT_LIMIT):
+        self.key = key.lstrip('-')
+        self.descending = key.startswith('-')
+        self.count_limit = count_limit
+        pk_order = '-pk' if self.descending else 'pk'
+        super().__init__(object_list.order_by(key, pk_order), per_page)
+
+    @cached_property
+    def count(self):
+        """Число записей, ограниченное сверху count_limit."""
+        if self.count_limit is None:
+            return self.object_list.count()
+        return self.object_list[:self.count_limit].count()
+
+    @property
+    def count_is_exact(self):
+        return self.count_limit is None or self.count < self.count_limit
+
+    def dump_value(self, value):
+        """Значение ключа для токена."""
+        return value.isoformat()
+
+    def load_value(self, value):
+        """Значение ключа из токена; для чужого значения — ValueError."""
+        value = parse_datetime(value) if isinstance(value, str) else None
+        if value is None:
+            raise ValueError('Некорректный курсор')
+        return value
+
+    def _fetch(self, value=None, pk=None, backwards=False):
+        queryset = self.object_list
+        if value is not None:
+            lookup = 'lt' if self.descending != backwards else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.key}__{lookup}': value})
+                | Q(**{self.key: value, f'pk__{lookup}': pk})
+            )
+        if backwards:
+            queryset = queryset.reverse()
+        return list(queryset[:self.per_page + 1])
+
+    def _cursor(self, direction, obj, number):
+        return encode_cursor(
+            direction, self.dump_value(getattr(obj, self.key)), obj.pk,
+            number,
+        )
+
+    def get_page(self, cursor):
+        """Возвращает страницу по токену; битый токен — первая страница."""
+        try:
+            direction, value, pk, number = decode_cursor(cursor)
+            value = self.load_value(value)
+        except ValueError:
+            direction, value, pk, number = NEXT, None, None, 1
+        backwards = direction == PREVIOUS
+        rows = self._fetch(value, pk, backwards)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = value is not None, has_more
+        number = max(number, 2) if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if rows and has_next:
+            page.next_cursor = self._cursor(NEXT, rows[-1], number + 1)
+        if rows and has_previous:
+            page.previous_cursor = self._cursor(
+                PREVIOUS, rows[0], number - 1
+            )
+        return page
+
+
+class SearchPaginator(CursorPaginator):
+    """Выдача поиска по ключу (релевантность, id), лучшие первыми.
+
+    Страницу ранжирует и обрезает поисковый индекс, из базы читаются
+    только посты этой страницы.
+    """
+
+    def __init__(self, query, per_page, count_limit=COUNT_LIMIT):
+        self.query = query
+        self.key = 'relevance'
+        self.descending = True
+        self.count_limit = count_limit
+        Paginator.__init__(self, [], per_page)
+
+    @cached_property
+    def count(self):
+        """Число найденных постов, ограниченное сверху count_limit."""
+        return len(search.rank_posts(self.query, self.count_limit))
+
+    def dump_value(self, value):
+        return value
+
+    def load_value(self, value):
+        if not isinstance(value, int):
+            raise ValueError('Некорректный курсор')
+        return value
+
+    def _fetch(self, value=None, pk=None, backwards=False):
+        after = None if value is None else (value, pk)
+        ranked = search.rank_posts(
+            self.query, self.per_page + 1, after, backwards
+        )
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for pk, _ in ranked]
+        )
+        rows = []
+        for pk, relevance in ranked:
+            if pk in posts:
+                posts[pk].relevance = relevance
+                rows.append(posts[pk])
+        return rows
 
 
 def get_paginator(request, posts):
-    paginator = Paginator(posts, PAGINATOR_QUANTITY)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    paginator = CursorPaginator(posts, PAGINATOR_QUANTITY)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def get_comments(post, cursor=None):
+    """Страница комментариев поста по порядку написания.
+
+    Первая страница общая для всех посетителей и хранится в кеше,
+    пока не изменится область post:<id> — её сбрасывает каждый новый
+    или удалённый комментарий — или область SITE, которую сбрасывает
+    смена имени автора. В кеш страница попадает только после коммита:
+    откаченная транзакция не оставит в нём своих комментариев.
+    """
+    paginator = CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_QUANTITY,
+        key='created',
+    )
+    if cursor:
+        return paginator.get_page(cursor)
+    versions = get_versions([SITE, f'post:{post.pk}'])
+    key = f'posts:comments:{post.pk}:' + ':'.join(map(str, versions))
+    cached = cache.get(key)
+    if cached is None:
+        page = paginator.get_page(None)
+        entry = (page.object_list, page.next_cursor)
+        transaction.on_commit(
+            lambda: cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+        )
+        return page
+    rows, next_cursor = cached
+    paginator.num_pages = 2 if next_cursor else 1
+    page = Page(rows, 1, paginator)
+    page.next_cursor = next_cursor
+    page.previous_cursor = None
+    return page
@@ -0,0 +1,203 @@
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, counters, images, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._saved_group_id = instance.__dict__.get('group_id', DEFERRED)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_user(instance.author_id, posts_count=1)
+        counters.shift_group(instance.group_id, 1)
+    elif instance._saved_group_id not in (DEFERRED, instance.group_id):
+        counters.shift_group(instance._saved_group_id, -1)
+        counters.shift_group(instance.group_id, 1)
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.shift_user(instance.author_id, posts_count=-1)
+    counters.shift_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(
+            Post.objects.filter(pk=instance.post_id), comments_count=1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.shift(Post.objects.filter(pk=instance.post_id), comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_user(instance.author_id, followers_count=1)
+        counters.shift_user(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.shift_user(instance.author_id, followers_count=-1)
+    counters.shift_user(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def save_image_variants(sender, instance, **kwargs):
+    variants = instance.__dict__.pop('_pending_variants', None)
+    for extension, data in (variants or {}).items():
+        # Варианты называются по оригиналу, а не по своему содержимому.
+        name = images.variant_name(instance.image.name, extension)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(data))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    author_id = instance.author_id
+    # После коммита: при удалении автора его посты к этому времени
+    # тоже удалены, и раскладывать будет нечего.
+    transaction.on_commit(lambda: timeline.catch_up(author_id))
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._saved_username = instance.__dict__.get('username', DEFERRED)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, created, **kwargs):
+    if created:
+        return
+    if instance._saved_username not in (DEFERRED, instance.username):
+        caching.invalidate(caching.SITE)
+    instance._saved_username = instance.username
+
+
+def post_scopes(post):
+    scopes = [
+        'feed',
+        f'post:{post.pk}',
+        f'profile:{post.author.username}',
+    ]
+    group_ids = {post.group_id, getattr(post, '_previous_group_id', None)}
+    group_ids.discard(None)
+    if group_ids:
+        scopes += [
+            f'group:{slug}' for slug in Group.objects.filter(
+                pk__in=group_ids
+            ).values_list('slug', flat=True)
+        ]
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_group(sender, instance, **kwargs):
+    instance._previous_group_id = instance._saved_group_id
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    caching.invalidate(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    caching.invalidate(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    caching.invalidate(caching.SITE)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    usernames = User.objects.filter(
+        pk__in=(instance.user_id, instance.author_id)
+    ).values_list('username', flat=True)
+    caching.invalidate(*(f'profile:{username}' for username in usernames))
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    search.index_posts([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def index_saved_comment(sender, instance, **kwargs):
+    search.index_comments([instance])
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    search.remove_comments([instance.pk])
+
+
+@receiver(post_init, sender=Group)
+def remember_group_title(sender, instance, **kwargs):
+    instance._saved_title = instance.__dict__.get('title', DEFERRED)
+
+
+@receiver(post_save, sender=Group)
+def index_renamed_group_posts(sender, instance, created, **kwargs):
+    if not created and instance._saved_title not in (
+        DEFERRED, instance.title
+    ):
+        search.index_posts(instance.posts.values_list('pk', flat=True))
+    instance._saved_title = instance.title
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    instance._post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def index_ungrouped_posts(sender, instance, **kwargs):
+    search.index_posts(instance._post_ids)
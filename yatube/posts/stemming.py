@@ -0,0 +1,62 @@
+"""Стеммер Портера (Snowball) для русского языка."""
+import re
+
+VOWELS = 'аеиоуыэюя'
+RV = re.compile(rf'^(.*?[{VOWELS}])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+I_ENDING = re.compile(r'и$')
+DERIVATIONAL = re.compile(rf'.*[^{VOWELS}]+[{VOWELS}].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+SOFT_SIGN = re.compile(r'ь$')
+DOUBLE_N = re.compile(r'нн$')
+
+
+def strip(pattern, word):
+    """Слово без окончания pattern и признак того, что оно было."""
+    stripped = pattern.sub('', word, 1)
+    return stripped, stripped != word
+
+
+def stem(word):
+    """Основа русского слова; прочие слова возвращаются как есть."""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    rv, found = strip(PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = strip(REFLEXIVE, rv)
+        rv, found = strip(ADJECTIVE, rv)
+        if found:
+            rv, _ = strip(PARTICIPLE, rv)
+        else:
+            rv, found = strip(VERB, rv)
+            if not found:
+                rv, _ = strip(NOUN, rv)
+    rv, _ = strip(I_ENDING, rv)
+    if DERIVATIONAL.match(rv):
+        rv, _ = strip(DERIVATIONAL_ENDING, rv)
+    rv, found = strip(SOFT_SIGN, rv)
+    if not found:
+        rv, _ = strip(SUPERLATIVE, rv)
+        rv = DOUBLE_N.sub('н', rv, 1)
+    return start + rv
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from .images import VARIANTS, variant_name
+
+HASH_CHUNK_SIZE = 64 * 1024
+HASHED_NAME = re.compile(r'(.+/)?([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?')
+
+
+def hash_content(content):
+    """SHA-256 файла: готовый от обработчика загрузки или посчитанный."""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются по хешу содержимого: posts/ab/abcd….jpg.
+
+    Одинаковые загрузки получают одно имя и хранятся один раз, поэтому
+    и миниатюры sorl для них общие. Файлы, на которые не ссылается
+    ни один пост, удаляет gc_media.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hash_content(content)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), digest[:2], digest + extension
+        ).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        try:
+            return self._save(name, content)
+        except FileExistsError:
+            # Свежее время изменения: пока пост с этой картинкой не закоммичен,
+            # gc_media не тронет файл, даже если прежние ссылки уже удалены.
+            os.utime(self.path(name))
+            return name
+
+    def get_available_name(self, name, max_length=None):
+        # _save создаёт файл с O_EXCL и зовёт этот метод, если файл уже
+        # есть. Имя по хешу не меняем: те же байты уже лежат под ним.
+        if is_hashed(name):
+            raise FileExistsError(name)
+        return super().get_available_name(name, max_length)
+
+
+content_storage = ContentAddressedStorage()
+
+
+def is_hashed(name):
+    """Имя выдано этим хранилищем, а не осталось от старых загрузок."""
+    return HASHED_NAME.fullmatch(name or '') is not None
+
+
+def delete_original(name):
+    """Удаляет оригинал вместе с вариантами, миниатюрами и записями sorl."""
+    from sorl.thumbnail import delete
+    delete(name, delete_file=False)
+    for extension in VARIANTS:
+        content_storage.delete(variant_name(name, extension))
+    content_storage.delete(name)
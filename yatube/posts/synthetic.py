@@ -0,0 +1,205 @@
+"""Синтетические данные для нагрузочных замеров."""
+import random
+from bisect import bisect
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from .models import Comment, Follow, Group, Post, User
+from .storage import content_storage
+from .transfer import BATCH_SIZE, chunked, keep_dates
+
+LOCALE = 'ru_RU'
+# Показатель степенного закона: чем больше, тем сильнее популярность
+# сосредоточена у немногих авторов.
+ALPHA = 1.2
+GROUP_SHARE = 0.6
+DAYS = 365
+IMAGE_SIZE = (1200, 800)
+FOLLOW_SHAPE = 1.5
+
+
+class PowerLaw:
+    """Выбор индекса 0..n-1 с весом 1 / (ранг ^ alpha)."""
+
+    def __init__(self, n, alpha, rng):
+        self.rng = rng
+        self.cumulative = list(
+            accumulate(1 / rank ** alpha for rank in range(1, n + 1))
+        )
+
+    def __call__(self):
+        point = self.rng.random() * self.cumulative[-1]
+        return bisect(self.cumulative, point)
+
+
+def make_image(rng, number):
+    """JPEG с градиентом и фигурами, чтобы миниатюры строились честно."""
+    image = Image.new('RGB', IMAGE_SIZE)
+    draw = ImageDraw.Draw(image)
+    start = [rng.randrange(256) for _ in range(3)]
+    end = [rng.randrange(256) for _ in range(3)]
+    width, height = IMAGE_SIZE
+    for y in range(height):
+        draw.line(
+            [(0, y), (width, y)],
+            fill=tuple(a + (b - a) * y // height for a, b in zip(start, end)),
+        )
+    for _ in range(8):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(20, 200)
+        draw.ellipse(
+            [x - radius, y - radius, x + radius, y + radius],
+            fill=tuple(rng.randrange(256) for _ in range(3)),
+        )
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    name = content_storage.save(
+        f'posts/synthetic_{number}.jpg', ContentFile(buffer.getvalue())
+    )
+    return name, width, height
+
+
+class Generator:
+    """Наполняет базу пользователями, группами, постами и подписками.
+
+    Популярность авторов распределена по степенному закону: немногие
+    пишут большую часть постов, собирают больше комментариев
+    и подписчиков. Производные данные (счётчики, ленты, поиск)
+    пересчитываются отдельно, см. transfer.rebuild_derived().
+    """
+
+    def __init__(self, seed=None, alpha=ALPHA, batch_size=BATCH_SIZE):
+        self.rng = random.Random(seed)
+        self.fake = Faker(LOCALE)
+        self.fake.seed_instance(seed)
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.now = timezone.now()
+
+    def save(self, model, objs):
+        """bulk_create пачками, по транзакции на пачку; число строк."""
+        saved = 0
+        for batch in chunked(objs, self.batch_size):
+            with transaction.atomic(), keep_dates(model):
+                model.objects.bulk_create(
+                    batch, ignore_conflicts=model is Follow
+                )
+            saved += len(batch)
+        return saved
+
+    def new_ids(self, model, first_id, *fields):
+        return list(
+            model.objects.filter(pk__gt=first_id).order_by('pk')
+            .values_list('pk', *fields)
+        )
+
+    def last_id(self, model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def users(self, count):
+        first_id = self.last_id(User)
+        password = make_password(None)
+
+        def build():
+            for number in range(count):
+                yield User(
+                    username=f'{self.fake.user_name()}_{first_id + number}',
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    email=self.fake.email(),
+                    password=password,
+                )
+        self.save(User, build())
+        return [pk for pk, in self.new_ids(User, first_id)]
+
+    def groups(self, count):
+        first_id = self.last_id(Group)
+        self.save(Group, (
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'group-{first_id + number}',
+                description=self.fake.paragraph(),
+            )
+            for number in range(count)
+        ))
+        return [pk for pk, in self.new_ids(Group, first_id)]
+
+    def images(self, count):
+        return [make_image(self.rng, number) for number in range(count)]
+
+    def date(self):
+        return self.now - timedelta(seconds=self.rng.randrange(DAYS * 86400))
+
+    def posts(self, count, user_ids, group_ids, images=(), image_share=0.2):
+        first_id = self.last_id(Post)
+        author = PowerLaw(len(user_ids), self.alpha, self.rng)
+        group = PowerLaw(len(group_ids), self.alpha, self.rng) if (
+            group_ids
+        ) else None
+
+        def build():
+            for _ in range(count):
+                post = Post(
+                    author_id=user_ids[author()],
+                    text=self.fake.paragraph(self.rng.randint(1, 8)),
+                    pub_date=self.date(),
+                )
+                if group and self.rng.random() < GROUP_SHARE:
+                    post.group_id = group_ids[group()]
+                if images and self.rng.random() < image_share:
+                    name, width, height = self.rng.choice(images)
+                    post.image = name
+                    post.image_width, post.image_height = width, height
+                yield post
+        self.save(Post, build())
+        return self.new_ids(Post, first_id, 'author_id', 'pub_date')
+
+    def comments(self, count, user_ids, posts):
+        """Комментарии чаще достаются постам популярных авторов."""
+        if not posts:
+            return 0
+        # Популярные авторы созданы первыми и имеют меньшие id.
+        by_rank = sorted(posts, key=lambda post: post[1])
+        post = PowerLaw(len(by_rank), self.alpha / 2, self.rng)
+
+        def build():
+            for _ in range(count):
+                post_id, _, pub_date = by_rank[post()]
+                yield Comment(
+                    post_id=post_id,
+                    author_id=self.rng.choice(user_ids),
+                    text=self.fake.sentence(),
+                    created=pub_date + (self.now - pub_date) * (
+                        self.rng.random()
+                    ),
+                )
+        return self.save(Comment, build())
+
+    def follows(self, average, user_ids):
+        """Число подписок у читателя и выбор автора — степенные законы."""
+        author = PowerLaw(len(user_ids), self.alpha, self.rng)
+        # Среднее распределения Парето равно shape / (shape - 1).
+        shape = max(self.alpha, FOLLOW_SHAPE)
+        scale = average * (shape - 1) / shape
+
+        def build():
+            for user_id in user_ids:
+                wanted = min(
+                    int(self.rng.paretovariate(shape) * scale),
+                    len(user_ids) - 1,
+                )
+                authors = {user_ids[author()] for _ in range(wanted)}
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+        return self.save(Follow, build())
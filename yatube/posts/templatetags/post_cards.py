@@ -0,0 +1,52 @@
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post.html'
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def card_key(post, show_group_link):
+    """Ключ карточки меняется вместе с постом, автором, группой и миниатюрами.
+
+    Миниатюры должны быть прикреплены к посту thumbnails.prefetch().
+    """
+    group = post.group if post.group_id else None
+    stamp = '|'.join(str(part) for part in (
+        post.text,
+        post.image.name,
+        post.author.username,
+        group and group.slug,
+        show_group_link,
+        *(thumbnail and thumbnail.name
+          for thumbnail in post.thumbnails.values()),
+    ))
+    digest = hashlib.md5(stamp.encode()).hexdigest()
+    return f'posts:card:{post.pk}:{digest}'
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, show_group_link=False):
+    """HTML карточек постов страницы; готовые берутся из кеша разом."""
+    posts = list(posts)
+    thumbnails.prefetch(posts)
+    keys = [card_key(post, show_group_link) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    card_template = context.template.engine.get_template(CARD_TEMPLATE)
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = card_template.render(context.new({
+                'post': post,
+                'show_group_link': show_group_link,
+            }))
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,18 @@
+from contextlib import ExitStack
+
+from django.test.runner import DiscoverRunner
+
+from .utils import synchronous_thumbnails
+
+
+class TestRunner(DiscoverRunner):
+    """manage.py test с тем же окружением, что и conftest.py под pytest."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.environment = ExitStack()
+        self.environment.enter_context(synchronous_thumbnails())
+
+    def teardown_test_environment(self, **kwargs):
+        self.environment.close()
+        super().teardown_test_environment(**kwargs)
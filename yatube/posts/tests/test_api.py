@@ -0,0 +1,146 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+POSTS_COUNT = 13
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=None if number % 2 else cls.group,
+            )
+            for number in range(POSTS_COUNT)
+        ]
+        cls.post = cls.posts[-1]
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {number}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(f'api:{name}', args=args), params)
+        return response, response.json()
+
+    def test_post_list_paging(self):
+        """Лента отдаётся страницами по курсору до конца"""
+        response, data = self.get('post_list')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0]['text'], self.post.text)
+        self.assertIsNone(data['previous'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), POSTS_COUNT - 10)
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только нужные поля и не делает JOIN"""
+        with self.assertNumQueries(1) as queries:
+            _, data = self.get('post_list', fields='id,text', limit=3)
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+        self.assertNotIn('comments_count', queries.captured_queries[0]['sql'])
+
+    def test_default_fields_one_query(self):
+        """Автор и группа приходят тем же запросом, что и посты"""
+        with self.assertNumQueries(1):
+            _, data = self.get('post_list')
+        first = data['results'][0]
+        self.assertEqual(first['author'], self.author.username)
+        self.assertEqual(first['group'], self.group.slug)
+        self.assertEqual(first['comments_count'], 3)
+
+    def test_unknown_field(self):
+        """Неизвестное поле — ошибка 400 в JSON"""
+        response, data = self.get('post_list', fields='id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', data['detail'])
+
+    def test_group_and_profile(self):
+        """Ленты группы и автора фильтруют посты, отсутствие — 404"""
+        _, data = self.get('group_post_list', self.group.slug, limit=100)
+        self.assertEqual(len(data['results']), (POSTS_COUNT + 1) // 2)
+        self.assertEqual(
+            {post['group'] for post in data['results']}, {self.group.slug}
+        )
+        _, data = self.get('profile_post_list', self.author.username)
+        self.assertEqual(len(data['results']), 10)
+        response, data = self.get('group_post_list', 'missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', data)
+
+    def test_post_item_and_comments(self):
+        """Пост и его комментарии в порядке написания"""
+        _, data = self.get('post_item', self.post.pk)
+        self.assertEqual(data['id'], self.post.pk)
+        self.assertEqual(data['text'], self.post.text)
+        _, data = self.get('comment_list', self.post.pk, limit=2)
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 0', 'Комментарий 1'],
+        )
+        data = self.client.get(data['next']).json()
+        self.assertEqual(data['results'][0]['author'], self.reader.username)
+
+    def test_follow_feed(self):
+        """Лента подписок только для вошедших и не кешируется публично"""
+        response, _ = self.get('follow_post_list')
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.reader)
+        response, data = self.get('follow_post_list')
+        self.assertEqual(data['results'][0]['id'], self.post.pk)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_conditional_get_and_invalidation(self):
+        """Публичные ответы кешируются с ETag и сбрасываются при записи"""
+        response, _ = self.get('post_item', self.post.pk)
+        etag = response['ETag']
+        url = reverse('api:post_item', args=[self.post.pk])
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Ещё комментарий'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments_count'], 4)
+
+    def test_list_follows_comments_count(self):
+        """Списки постов сбрасываются, когда меняется comments_count"""
+        lists = (
+            ('post_list', ()),
+            ('group_post_list', (self.group.slug,)),
+            ('profile_post_list', (self.author.username,)),
+        )
+        for name, args in lists:
+            self.get(name, *args)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Ещё комментарий'
+        )
+        for name, args in lists:
+            with self.subTest(name=name):
+                _, data = self.get(name, *args)
+                self.assertEqual(data['results'][0]['comments_count'], 4)
+
+    def test_read_only(self):
+        """Изменять данные через API нельзя"""
+        response = self.client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
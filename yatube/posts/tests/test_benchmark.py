@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from core.benchmark import get_routes, get_sample, percentile
+from ..models import Comment, Follow, Group, Post, User, UserCounters
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_data', '--users', '30', '--groups', '3',
+            '--posts', '120', '--comments', '200', '--follows', '5',
+            '--images', '2', '--seed', '1', stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_generated_data(self):
+        """Данные созданы, популярность распределена неравномерно"""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        posts = sorted(
+            UserCounters.objects.values_list('posts_count', flat=True),
+            reverse=True,
+        )
+        self.assertEqual(sum(posts), 120)
+        self.assertGreater(posts[0], 120 / 30 * 3)
+
+    def test_routes_cover_all_urls(self):
+        """Замеряются все маршруты posts, users и about"""
+        routes = get_routes(get_sample())
+        for name in (
+            'posts:index', 'posts:post_edit', 'posts:search',
+            'users:password_reset_confirm', 'users:logout', 'about:tech',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(name, routes)
+
+    def test_benchmark_report(self):
+        """Отчёт сохраняется в JSON и сравнивается с прошлым прогоном"""
+        path = os.path.join(TEMP_MEDIA_ROOT, 'bench.json')
+        follows = Follow.objects.count()
+        call_command(
+            'benchmark', '--iterations', '3', '--warmup', '0',
+            '--output', path, stdout=StringIO(),
+        )
+        with open(path) as stream:
+            report = json.load(stream)
+        self.assertEqual(report['meta']['dataset']['posts'], 120)
+        index = report['routes']['posts:index']
+        self.assertEqual(index['status'], 200)
+        self.assertEqual(index['iterations'], 3)
+        self.assertGreater(index['peak_memory_kb'], 0)
+        self.assertLessEqual(index['p50_ms'], index['p99_ms'])
+        self.assertEqual(Follow.objects.count(), follows)
+        out = StringIO()
+        call_command(
+            'benchmark', '--iterations', '2', '--only', 'about',
+            '--compare', path, stdout=out,
+        )
+        self.assertIn('about:author', out.getvalue())
+        self.assertNotIn('posts:index', out.getvalue())
+
+    def test_percentile(self):
+        """Процентили считаются с интерполяцией"""
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(percentile([10, 20], 90), 19)
+
+
+class EmptyBenchmarkTest(TestCase):
+    def test_empty_database(self):
+        """Без постов замер сообщает об ошибке"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', stdout=StringIO())
@@ -0,0 +1,128 @@
+from django.core.cache import InvalidCacheKey, cache, caches
+from django.core.cache.backends.memcached import MemcachedCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import TwoLevelCache
+from ..models import Post, User
+from .utils import MemcachedStandIn
+
+
+class SharedCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MemcachedStandIn()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.data.clear()
+        self.server.commands.clear()
+
+
+class MemcachedCacheTest(SharedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = MemcachedCache(self.server.location, {})
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_basic_operations(self):
+        """Клиент сохраняет, читает, удаляет и считает значения"""
+        self.cache.set('post', {'text': 'Тестовый пост'})
+        self.assertEqual(self.cache.get('post'), {'text': 'Тестовый пост'})
+        self.assertFalse(self.cache.add('post', 'другое'))
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.decr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('counter'))
+
+    def test_get_many_is_one_command(self):
+        """get_many читает все ключи одной командой"""
+        self.cache.set_many({f'card:{i}': i for i in range(5)})
+        self.server.commands.clear()
+        found = self.cache.get_many(['card:1', 'card:3', 'card:9'])
+        self.assertEqual(found, {'card:1': 1, 'card:3': 3})
+        self.assertEqual(self.server.commands, ['get'])
+
+    def test_invalid_key_does_not_break_protocol(self):
+        """Ключ с пробелом отвергается до отправки на сервер"""
+        with self.assertRaises(InvalidCacheKey):
+            self.cache.set('два слова', 'значение')
+        self.cache.set('post', 'значение')
+        self.assertEqual(self.cache.get('post'), 'значение')
+        self.assertEqual(self.server.commands, ['set', 'get'])
+
+    def test_outage_fails_soft(self):
+        """Недоступный memcached — промах, а не ошибка страницы"""
+        self.cache.set('post', 'значение')
+        self.server.stop()
+        self.addCleanup(self.restart_server)
+        self.cache.close()
+        self.assertIsNone(self.cache.get('post'))
+        self.assertEqual(self.cache.get_many(['post']), {})
+        self.cache.set('post', 'новое')
+        self.assertFalse(self.cache.add('counter', 1))
+        with self.assertRaises(ValueError):
+            self.cache.incr('counter')
+
+    def restart_server(self):
+        type(self).server = MemcachedStandIn()
+        self.server.start()
+
+
+class TwoLevelCacheTest(SharedCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.caches = {
+            'default': {
+                'BACKEND': 'core.cache.TwoLevelCache',
+                'LOCATION': 'shared',
+                'OPTIONS': {'L1_TIMEOUT': 60},
+            },
+            'shared': {
+                'BACKEND': (
+                    'django.core.cache.backends.memcached.MemcachedCache'
+                ),
+                'LOCATION': self.server.location,
+            },
+        }
+
+    def test_hot_keys_served_from_process(self):
+        """Повторные чтения не обращаются к общему кешу"""
+        with override_settings(CACHES=self.caches):
+            self.assertIsInstance(caches['default'], TwoLevelCache)
+            cache.clear()
+            cache.set('hot', 'значение')
+            caches['shared'].set('hot', 'изменено в другом процессе')
+            self.server.commands.clear()
+            self.assertEqual(cache.get('hot'), 'значение')
+            self.assertEqual(
+                cache.get_many(['hot', 'cold']), {'hot': 'значение'}
+            )
+            self.assertEqual(self.server.commands, ['get'])
+            cache.delete('hot')
+            self.assertEqual(cache.get('hot', 'удалено'), 'удалено')
+
+    def test_site_works_over_shared_cache(self):
+        """Страницы кешируются и сбрасываются через общий кеш"""
+        user = User.objects.create(username='auth')
+        Post.objects.create(author=user, text='Первый пост')
+        with override_settings(CACHES=self.caches):
+            cache.clear()
+            self.client.get(reverse('posts:index'))
+            self.assertTrue(self.server.data)
+            Post.objects.create(author=user, text='Второй пост')
+            response = self.client.get(reverse('posts:index'))
+            self.assertContains(response, 'Второй пост')
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from .. import thumbnails
+from ..models import Group, Post, User
+from ..templatetags.post_cards import card_key
+
+CARDS = Template(
+    '{% load post_cards %}{% post_cards posts show_group_link=True as cards %}'
+    '{% for card in cards %}{{ card }}{% endfor %}'
+)
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='posts_author')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        for i in range(3):
+            Post.objects.create(
+                text=f'Пост №{i}', author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self):
+        posts = Post.objects.select_related('author', 'group')
+        return CARDS.render(Context({'posts': posts}))
+
+    def test_cards_are_cached(self):
+        """Карточки сохраняются в кеш и берутся оттуда без рендеринга"""
+        html = self.render()
+        self.assertEqual(html.count('<article>'), 3)
+        post = Post.objects.select_related('author', 'group').first()
+        thumbnails.prefetch([post])
+        key = card_key(post, True)
+        cache.set(key, '<article>из кеша</article>')
+        self.assertIn('из кеша', self.render())
+
+    def test_changes_produce_new_card(self):
+        """Правка поста, автора или группы даёт новую карточку"""
+        self.render()
+        post = Post.objects.get(text='Пост №0')
+        post.text = 'Исправленный пост'
+        post.save()
+        self.author.username = 'renamed'
+        self.author.save()
+        self.group.slug = 'new-slug'
+        self.group.save()
+        html = self.render()
+        self.assertIn('Исправленный пост', html)
+        self.assertIn('/profile/renamed/', html)
+        self.assertIn('/group/new-slug/', html)
+        self.assertNotIn('posts_author', html)
@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User, UserCounters
+
+
+class ExplainViewsCommandTest(TestCase):
+    def test_empty_database(self):
+        """Без постов команда сообщает об ошибке"""
+        with self.assertRaises(CommandError):
+            call_command('explain_views', stdout=StringIO())
+
+    def test_feeds_use_indexes(self):
+        """Ленты читаются по индексам без сортировки во временном B-дереве"""
+        user = User.objects.create(username='auth')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=user, text='Тестовый пост', group=group)
+        out = StringIO()
+        call_command('explain_views', stdout=out)
+        output = out.getvalue()
+        for view in ('index', 'group_posts', 'profile', 'post_detail'):
+            with self.subTest(view=view):
+                self.assertIn(f'{view}:', output)
+        feeds = output.split('post_detail:')[0]
+        self.assertNotIn('TEMP B-TREE', feeds)
+        self.assertFalse(Post.objects.exclude(text='Тестовый пост').exists())
+
+
+class ReconcileCountersCommandTest(TestCase):
+    def test_drift_is_reported_and_fixed(self):
+        """Команда находит и исправляет расхождения счётчиков"""
+        user = User.objects.create(username='auth')
+        post = Post.objects.create(author=user, text='Тестовый пост')
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        UserCounters.objects.filter(user=user).update(posts_count=0)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('Post.comments_count: расхождений 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 5)
+        call_command('reconcile_counters', stdout=StringIO())
+        post.refresh_from_db()
+        user.counters.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(user.counters.posts_count, 1)
+
+
+class CacheStatsCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_are_printed(self):
+        """Команда выводит статистику кеша страниц"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('cache_stats', stdout=out)
+        self.assertIn('index: попаданий 1, промахов 1', out.getvalue())
+        self.assertIn('post_list: попаданий 0', out.getvalue())
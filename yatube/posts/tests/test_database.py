@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.db import apply_sqlite_pragmas
+from ..models import Comment, Post, User
+
+
+class SqlitePragmasTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_applied(self):
+        """Настройки SQLite задаются при открытии соединения"""
+        apply_sqlite_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_no_pragmas_by_default(self):
+        """Без SQLITE_PRODUCTION соединение не меняется"""
+        before = self.pragma('busy_timeout')
+        apply_sqlite_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.pragma('busy_timeout'), before)
+
+
+class BenchWritesCommandTest(TransactionTestCase):
+    def test_concurrent_writes(self):
+        """Замер записи отчитывается по каждому view и убирает за собой"""
+        existing = User.objects.create(username='bench_writer_0')
+        out = StringIO()
+        call_command(
+            'bench_writes', '--clients', '2', '--requests', '3',
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('post_create: 6 запросов', output)
+        self.assertIn('add_comment: 6 запросов', output)
+        self.assertIn('запросов/с', output)
+        self.assertEqual(list(User.objects.all()), [existing])
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
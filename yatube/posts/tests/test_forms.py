@@ -1,8 +1,18 @@
-from django.test import Client, TestCase
-from django.urls import reverse
+import shutil
+import tempfile
+from unittest import mock
 
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
 
+from .. import images
 from ..models import Group, Post, User
+from .utils import ROTATED_90, make_upload
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class PostCreateEditFormTests(TestCase):
@@ -92,3 +102,67 @@ class PostCreateEditFormTests(TestCase):
             'posts:post_detail', args={self.post.id}
         ))
         self.assertEqual(self.post.comments.count(), 1)
+
+
+@override_settings(POST_IMAGE_MAX_SIDE=300, MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageFormTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='post_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    def test_image_is_downsized_and_stripped(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет EXIF"""
+        self.create_post(
+            make_upload('photo.jpg', (900, 450), orientation=ROTATED_90)
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual((post.image_width, post.image_height), (150, 300))
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (150, 300))
+            self.assertNotIn('exif', stored.info)
+
+    def test_too_small_image_rejected(self):
+        """Слишком маленькая картинка не проходит проверку"""
+        response = self.create_post(make_upload('tiny.jpg', (4, 4)))
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_truncated_image_rejected(self):
+        """Обрезанный JPEG даёт ошибку формы, а не ошибку сервера"""
+        data = make_upload('broken.jpg', (200, 200)).read()
+        response = self.create_post(
+            SimpleUploadedFile('broken.jpg', data[:-100], 'image/jpeg')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    @mock.patch.object(images, 'VARIANTS', {'png': lambda: True})
+    def test_variants_are_saved(self):
+        """Дополнительные форматы сохраняются рядом с картинкой"""
+        self.create_post(make_upload('photo.jpg', (60, 40)))
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(post.image_variants, 'png')
+        variant = images.variant_name(post.image.name, 'png')
+        self.assertTrue(post.image.storage.exists(variant))
+        self.assertEqual(post.image_sources(), [{
+            'url': post.image.storage.url(variant),
+            'type': 'image/png',
+        }])
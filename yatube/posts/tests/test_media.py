@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.media import serve
+
+CONTENT = bytes(range(100))
+HASHED = 'posts/ab/ab' + '0' * 62 + '.jpg'
+THUMBNAIL = 'cache/12/34/' + '5' * 32 + '.jpg'
+LEGACY = 'posts/legacy.jpg'
+
+
+class MediaServeTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        for name in (HASHED, THUMBNAIL, LEGACY):
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+        settings = override_settings(
+            MEDIA_ROOT=self.root, MEDIA_SERVE='python', MEDIA_MAX_AGE=60
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.factory = RequestFactory()
+
+    def get(self, name, **headers):
+        return serve(self.factory.get(f'/media/{name}', **headers), name)
+
+    def test_whole_file(self):
+        """Файл отдаётся целиком с ETag и поддержкой диапазонов"""
+        response = self.get(HASHED)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_cache_lifetime(self):
+        """Файлы с хешем в имени кешируются на год, остальные ненадолго"""
+        for name in (HASHED, THUMBNAIL):
+            with self.subTest(name=name):
+                cache_control = self.get(name)['Cache-Control']
+                self.assertIn('max-age=31536000', cache_control)
+                self.assertIn('immutable', cache_control)
+        self.assertIn('max-age=60', self.get(LEGACY)['Cache-Control'])
+
+    def test_not_modified(self):
+        """Совпавший ETag даёт 304"""
+        etag = self.get(HASHED)['ETag']
+        response = self.get(HASHED, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_ranges(self):
+        """Диапазоны байтов отдаются с кодом 206"""
+        cases = (
+            ('bytes=0-9', 0, 9),
+            ('bytes=90-', 90, 99),
+            ('bytes=-5', 95, 99),
+            ('bytes=95-200', 95, 99),
+        )
+        for header, start, end in cases:
+            with self.subTest(header=header):
+                response = self.get(HASHED, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {start}-{end}/100'
+                )
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    CONTENT[start:end + 1],
+                )
+
+    def test_unsatisfiable_and_ignored_ranges(self):
+        """Диапазон за концом файла — 416, чужой If-Range — весь файл"""
+        response = self.get(HASHED, HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+        response = self.get(
+            HASHED, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.get(HASHED, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+
+    def test_offload(self):
+        """Фронтовому серверу передаётся только путь к файлу"""
+        with override_settings(MEDIA_SERVE='x-accel',
+                               MEDIA_ACCEL_PREFIX='/protected/'):
+            response = self.get(HASHED)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{HASHED}')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SERVE='x-sendfile'):
+            response = self.get(LEGACY)
+        self.assertEqual(
+            response['X-Sendfile'], os.path.join(self.root, LEGACY)
+        )
+
+    def test_not_found(self):
+        """Отсутствующие файлы, каталоги и пути наружу дают 404"""
+        for name in ('posts/missing.jpg', 'posts', '../secret.txt'):
+            with self.subTest(name=name):
+                with self.assertRaises(Http404):
+                    self.get(name)
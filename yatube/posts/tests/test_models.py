@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -25,3 +25,61 @@ class PostModelTest(TestCase):
         """Отображение поля __str__ в объектах моделей."""
         self.assertEqual(self.post.text[:15], str(self.post))
         self.assertEqual(self.group.title, str(self.group))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Вторая группа',
+            slug='second-slug',
+            description='Тестовое описание',
+        )
+
+    def refresh(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+
+    def test_post_counters(self):
+        """Посты пользователя и группы считаются при создании и удалении"""
+        post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group)
+        self.refresh(self.author.counters, self.group)
+        self.assertEqual(self.author.counters.posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = self.group_2
+        post.save()
+        self.refresh(self.group, self.group_2)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 1)
+        post.delete()
+        self.refresh(self.author.counters, self.group_2)
+        self.assertEqual(self.author.counters.posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Комментарии и подписки обновляют счётчики"""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        comment = Comment.objects.create(
+            author=self.reader, post=post, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.refresh(self.author.counters, self.reader.counters)
+        self.assertEqual(self.author.counters.followers_count, 1)
+        self.assertEqual(self.reader.counters.following_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.refresh(self.author.counters, self.reader.counters)
+        self.assertEqual(self.author.counters.followers_count, 0)
+        self.assertEqual(self.reader.counters.following_count, 0)
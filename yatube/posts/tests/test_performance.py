@@ -0,0 +1,93 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from core.middleware import server_timing
+from ..models import Post, User
+
+
+@override_settings(PERF_SAMPLE_RATE=1, PERF_SERVER_TIMING=True)
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_metrics(self, url):
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            response = self.client.get(url)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_sampled_request(self):
+        """Выбранный запрос получает Server-Timing и подробную строку лога"""
+        response, metrics = self.get_metrics(reverse('posts:index'))
+        header = response['Server-Timing']
+        for name in ('total;dur=', 'sql;dur=', 'tpl;dur=', 'thumb;dur='):
+            with self.subTest(name=name):
+                self.assertIn(name, header)
+        self.assertIn(f'{metrics["sql_count"]} queries', header)
+        self.assertEqual(metrics['view'], 'posts:index')
+        self.assertEqual(metrics['status'], 200)
+        self.assertGreater(metrics['sql_count'], 0)
+        self.assertGreater(metrics['template_ms'], 0)
+        self.assertGreater(metrics['cache_misses'], 0)
+        _, metrics = self.get_metrics(reverse('posts:index'))
+        self.assertGreater(metrics['cache_hits'], 0)
+
+    @override_settings(PERF_SAMPLE_RATE=0, PERF_SLOW_MS=0)
+    def test_unsampled_slow_request(self):
+        """Невыбранный медленный запрос логируется только с общим временем"""
+        response, metrics = self.get_metrics(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn('total_ms', metrics)
+        self.assertNotIn('sql_count', metrics)
+
+    @override_settings(PERF_SAMPLE_RATE=0, PERF_SLOW_MS=60_000)
+    def test_fast_request_not_logged(self):
+        """Быстрые невыбранные запросы не пишутся в лог"""
+        with self.assertRaises(AssertionError):
+            self.get_metrics(reverse('about:author'))
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        """Заголовок Server-Timing отключается настройкой"""
+        response, _ = self.get_metrics(reverse('about:author'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class RecorderTest(TestCase):
+    def test_duplicate_queries(self):
+        """Повторы запросов с теми же параметрами находятся"""
+        with profiling.recording() as recorder:
+            with connection.execute_wrapper(recorder.execute):
+                for username in ('a', 'a', 'b'):
+                    list(User.objects.filter(username=username))
+        self.assertEqual(recorder.query_count, 3)
+        self.assertEqual(list(recorder.duplicates.values()), [1])
+        self.assertEqual(recorder.similar, 2)
+
+    def test_nested_timers(self):
+        """Вложенные участки с одним именем не считаются дважды"""
+        with profiling.recording() as recorder:
+            with profiling.timer('template'):
+                with profiling.timer('template'):
+                    pass
+            outer = recorder.timings['template']
+        self.assertGreater(outer, 0)
+        self.assertEqual(len(recorder.timings), 1)
+
+    def test_server_timing(self):
+        """Заголовок собирается по формату Server-Timing"""
+        self.assertEqual(
+            server_timing([('sql', 1.234, '2 queries'), ('cache', None, 'x')]),
+            'sql;dur=1.2;desc="2 queries", cache;desc="x"',
+        )
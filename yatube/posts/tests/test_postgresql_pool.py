@@ -0,0 +1,87 @@
+import os
+import threading
+import unittest
+
+from django.db import connections
+from django.test import SimpleTestCase
+
+try:
+    import psycopg2
+    from psycopg2 import pool
+
+    from core.db.postgresql_pool.base import WaitingConnectionPool
+except ImportError:
+    psycopg2 = None
+
+ALIAS = 'pool_test'
+# Сервер для проверки пула; без него тесты пропускаются.
+SERVER = {
+    'NAME': os.getenv('TEST_PG_NAME', 'postgres'),
+    'USER': os.getenv('TEST_PG_USER', 'postgres'),
+    'PASSWORD': os.getenv('TEST_PG_PASSWORD', ''),
+    'HOST': os.getenv('TEST_PG_HOST', 'localhost'),
+    'PORT': os.getenv('TEST_PG_PORT', '5432'),
+}
+
+
+@unittest.skipIf(psycopg2 is None, 'psycopg2 не установлен')
+class PostgresqlPoolTest(SimpleTestCase):
+    """Пул на настоящем PostgreSQL из TEST_PG_*."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.params = {
+            'dbname': SERVER['NAME'],
+            'user': SERVER['USER'],
+            'password': SERVER['PASSWORD'],
+            'host': SERVER['HOST'],
+            'port': SERVER['PORT'],
+        }
+        try:
+            psycopg2.connect(connect_timeout=2, **cls.params).close()
+        except psycopg2.OperationalError as error:
+            raise unittest.SkipTest(f'PostgreSQL недоступен: {error}')
+        super().setUpClass()
+        # Псевдоним добавляется после setUpClass, иначе SimpleTestCase
+        # запретит запросы к нему.
+        connections.databases[ALIAS] = dict(
+            SERVER, ENGINE='core.db.postgresql_pool', TEST={},
+            POOL={'MIN': 1, 'MAX': 2, 'TIMEOUT': 5},
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        super().tearDownClass()
+
+    def backend_pid(self):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_connection_returned_to_pool(self):
+        """Закрытое соединение возвращается в пул и берётся снова"""
+        first = self.backend_pid()
+        connections[ALIAS].close()
+        self.assertEqual(self.backend_pid(), first)
+
+    def test_exhausted_pool_waits(self):
+        """Без свободных соединений getconn ждёт возврата"""
+        waiting_pool = WaitingConnectionPool(0, 1, 5, **self.params)
+        self.addCleanup(waiting_pool.closeall)
+        held = waiting_pool.getconn()
+        threading.Timer(0.2, waiting_pool.putconn, [held]).start()
+        connection = waiting_pool.getconn()
+        self.assertFalse(connection.closed)
+        waiting_pool.putconn(connection)
+
+    def test_exhausted_pool_times_out(self):
+        """Если соединение не вернули за TIMEOUT, getconn бросает PoolError"""
+        waiting_pool = WaitingConnectionPool(0, 1, 0.1, **self.params)
+        self.addCleanup(waiting_pool.closeall)
+        held = waiting_pool.getconn()
+        with self.assertRaises(pool.PoolError):
+            waiting_pool.getconn()
+        waiting_pool.putconn(held)
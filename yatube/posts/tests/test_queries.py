@@ -0,0 +1,143 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..servises import PAGINATOR_QUANTITY
+from ..urls import urlpatterns
+from .utils import QueryBudgetMixin
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='posts_author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Текст поста',
+            author=cls.author,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            text='Комментарий', author=cls.reader, post=cls.post
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get_budgets(self):
+        """Имя URL: (клиент, адрес, бюджет запросов, метод, данные)."""
+        post_args = {self.post.id}
+        return {
+            'index': (
+                self.reader_client, reverse('posts:index'), 3, 'get', None
+            ),
+            'group_list': (
+                self.reader_client,
+                reverse('posts:group_list', args={self.group.slug}),
+                4, 'get', None,
+            ),
+            'profile': (
+                self.reader_client,
+                reverse('posts:profile', args={self.author.username}),
+                5, 'get', None,
+            ),
+            'post_detail': (
+                self.reader_client,
+                reverse('posts:post_detail', args=post_args),
+                4, 'get', None,
+            ),
+            'post_comments': (
+                self.reader_client,
+                reverse('posts:post_comments', args=post_args),
+                4, 'get', None,
+            ),
+            'post_create': (
+                self.author_client, reverse('posts:post_create'),
+                3, 'get', None,
+            ),
+            'post_edit': (
+                self.author_client,
+                reverse('posts:post_edit', args=post_args),
+                4, 'get', None,
+            ),
+            'add_comment': (
+                self.reader_client,
+                reverse('posts:add_comment', args=post_args),
+                10, 'post', {'text': 'Новый комментарий'},
+            ),
+            'follow_index': (
+                self.reader_client, reverse('posts:follow_index'),
+                5, 'get', None,
+            ),
+            'search': (
+                self.reader_client, reverse('posts:search') + '?q=текст',
+                4, 'get', None,
+            ),
+            'profile_follow': (
+                self.reader_client,
+                reverse('posts:profile_follow', args={self.author.username}),
+                4, 'get', None,
+            ),
+            'profile_unfollow': (
+                self.reader_client,
+                reverse(
+                    'posts:profile_unfollow', args={self.author.username}
+                ),
+                9, 'get', None,
+            ),
+        }
+
+    def test_every_url_has_budget(self):
+        """Для каждого адреса posts задан бюджет запросов"""
+        budgets = self.get_budgets()
+        for pattern in urlpatterns:
+            with self.subTest(name=pattern.name):
+                self.assertIn(pattern.name, budgets)
+
+    def test_urls_fit_budget(self):
+        """Страницы укладываются в бюджет запросов"""
+        for name, (client, url, budget, method, data) in (
+            self.get_budgets().items()
+        ):
+            with self.subTest(name=name):
+                cache.clear()
+                self.assertQueryBudget(client, url, budget, method, data)
+
+    def test_feeds_do_not_depend_on_page_size(self):
+        """Число запросов не растёт вместе с числом постов и комментариев"""
+        feeds = (
+            'index', 'group_list', 'profile', 'follow_index', 'post_detail'
+        )
+        budgets = self.get_budgets()
+        before = {}
+        for name in feeds:
+            client, url = budgets[name][:2]
+            cache.clear()
+            before[name] = len(self.get_queries(client, url)[1])
+        for i in range(PAGINATOR_QUANTITY):
+            post = Post.objects.create(
+                text=f'Пост №{i}', author=self.author, group=self.group
+            )
+            for commented in (post, self.post):
+                Comment.objects.create(
+                    text='Комментарий', author=self.reader, post=commented
+                )
+        for name in feeds:
+            client, url = budgets[name][:2]
+            with self.subTest(name=name):
+                cache.clear()
+                self.assertEqual(
+                    len(self.get_queries(client, url)[1]), before[name]
+                )
@@ -0,0 +1,120 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import querylog
+from ..models import Post, User
+
+
+class FingerprintTest(TestCase):
+    def test_literals_are_normalized(self):
+        """Литералы, параметры и списки IN заменяются заглушками"""
+        self.assertEqual(
+            querylog.fingerprint(
+                "SELECT \"t1\".\"id\" FROM t1 WHERE id = 5 AND name = 'it''s'"
+                " AND pk IN (%s, %s,  %s) LIMIT 21"
+            ),
+            'SELECT "t1"."id" FROM t1 WHERE id = ? AND name = ? '
+            'AND pk IN (...) LIMIT ?',
+        )
+
+    def test_percentile(self):
+        """p95 — граница корзины, где набирается 95% запросов"""
+        histogram = [0] * (len(querylog.BUCKETS) + 1)
+        histogram[querylog.bucket(0.3)] = 95
+        histogram[querylog.bucket(40)] = 5
+        self.assertEqual(querylog.percentile(histogram, 100, 40), 0.5)
+        self.assertEqual(querylog.percentile(histogram, 100, 40, 99), 40)
+
+
+@override_settings(QUERYLOG_ENABLED=True)
+class QueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.user = User.objects.create(username='auth')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        querylog.install(None, connection)
+        self.addCleanup(
+            connection.execute_wrappers.remove, querylog.execute
+        )
+        cache.clear()
+        querylog.reset()
+        self.client = Client()
+
+    def test_every_process_reported(self):
+        """Сводки процессов собираются из их собственных ячеек"""
+        other = querylog.Aggregator()
+        other.key = 'querylog:process:other:1'
+        other.add('posts:other', 'SELECT 1 FROM other_table', 1.0)
+        other.flush(force=True)
+        self.client.get(reverse('posts:index'))
+        views = {row['view'] for row in querylog.get_report('view')}
+        self.assertIn('posts:other', views)
+        self.assertIn('posts:index', views)
+        self.assertNotEqual(other.slot, querylog.aggregator.slot)
+
+    @override_settings(QUERYLOG_MAX_STATS=2)
+    def test_stats_bounded(self):
+        """Сверх QUERYLOG_MAX_STATS запросы копятся в одной строке"""
+        aggregator = querylog.Aggregator()
+        for table in ('a', 'b', 'c', 'd'):
+            aggregator.add('view', f'SELECT * FROM {table}', 1.0)
+        self.assertEqual(len(aggregator.stats), 3)
+        overflow = [
+            stat for stat in aggregator.stats.values()
+            if stat['sql'] == querylog.OVERFLOW_SQL
+        ]
+        self.assertEqual(overflow[0]['count'], 2)
+
+    def test_queries_grouped_by_view(self):
+        """Запросы страницы собираются под именем её view"""
+        self.client.get(reverse('posts:index'))
+        rows = querylog.get_report('view')
+        views = {row['view'] for row in rows}
+        self.assertIn('posts:index', views)
+        for row in rows:
+            with self.subTest(sql=row['sql']):
+                self.assertLessEqual(row['p95'], row['max'])
+                self.assertGreater(row['count'], 0)
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_slow_query_logged_with_origin(self):
+        """Медленный запрос пишется в лог вместе с местом вызова"""
+        with self.assertLogs('yatube.sql', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertTrue(any(
+            'posts:index' in line and 'posts/' in line
+            for line in logs.output
+        ))
+
+    def test_report_command(self):
+        """Команда показывает сводку и обнуляет её"""
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('query_report', '--sort', 'count', stdout=out)
+        self.assertIn('posts_post', out.getvalue())
+        call_command('query_report', '--reset', stdout=StringIO())
+        self.assertEqual(querylog.get_report(), [])
+
+    def test_admin_page(self):
+        """Страница сводки доступна только персоналу"""
+        url = reverse('query_log')
+        response = self.client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("admin:login")}?next={url}'
+        )
+        self.client.force_login(self.admin)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(url, {'by': 'view', 'sort': 'p95'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'posts:index')
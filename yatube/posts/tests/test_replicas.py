@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import (
+    Client, SimpleTestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core.db import router
+from ..models import Post, User
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = router.ReplicaRouter()
+        router.reset()
+        self.addCleanup(router.reset)
+
+    def test_reads_go_to_replica(self):
+        """Без записи чтение идёт на реплику"""
+        self.assertEqual(self.router.db_for_read(Post), REPLICA)
+
+    def test_write_pins_to_primary(self):
+        """После записи поток читает из основной базы"""
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertTrue(router.has_written())
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_sessions_use_primary(self):
+        """Сессии читаются из основной базы, их запись не закрепляет поток"""
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+        self.router.db_for_write(Session)
+        self.assertFalse(router.has_written())
+        self.assertEqual(self.router.db_for_read(Post), REPLICA)
+
+    def test_primary_block(self):
+        """router.primary() закрепляет чтение только внутри блока"""
+        with router.primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), REPLICA)
+
+    def test_write_in_primary_block_is_kept(self):
+        """Запись внутри router.primary() закрепляет поток и после блока"""
+        with router.primary():
+            self.router.db_for_write(Post)
+        self.assertTrue(router.has_written())
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_no_migrations_on_replica(self):
+        """Схему реплик не трогаем: она приходит с репликацией"""
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReadYourWritesTest(TransactionTestCase):
+    """Реплика — отдельный файл SQLite, который копирует sync_replica."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(directory, 'replica.sqlite3'),
+            TEST={},
+        )
+        self.addCleanup(self.remove_replica)
+        self.author = User.objects.create_user(username='author')
+        call_command('sync_replica', stdout=StringIO())
+        self.client.force_login(self.author)
+        router.reset()
+
+    def remove_replica(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        router.reset()
+
+    def profile(self, client):
+        cache.clear()
+        return client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+
+    def test_author_sees_own_post(self):
+        """После post_create автор видит свой пост, которого нет в реплике"""
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'},
+            follow=True,
+        )
+        self.assertIn(router.PIN_COOKIE, self.client.cookies)
+        self.assertContains(response, 'Свежий пост')
+        self.assertContains(self.profile(self.client), 'Свежий пост')
+
+    def test_other_clients_read_replica(self):
+        """Остальные читают реплику и видят пост после синхронизации"""
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        router.reset()
+        fresh = Post.objects.filter(text='Свежий пост')
+        self.assertFalse(fresh.exists())
+        call_command('sync_replica', stdout=StringIO())
+        self.assertTrue(fresh.exists())
+
+    def test_cached_pages_built_from_primary(self):
+        """Страница для кеша собирается из основной базы, а не из реплики"""
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        self.assertContains(self.profile(Client()), 'Свежий пост')
+
+    def test_session_read_from_primary(self):
+        """Сессия, созданная после синхронизации, находится без cookie"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(router.PIN_COOKIE, response.cookies)
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
@@ -0,0 +1,193 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Group, Post
+from ..servises import PAGINATOR_QUANTITY
+from ..stemming import stem
+
+User = get_user_model()
+
+
+class StemmingTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к общей основе"""
+        cases = (
+            ('кошка', 'кошки', 'кошкой', 'кошками'),
+            ('бежать', 'бежал', 'бежали'),
+            ('красивый', 'красивая', 'красивого'),
+        )
+        for forms in cases:
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(form) for form in forms}), 1)
+
+    def test_other_words_kept(self):
+        """Слова не на русском не меняются"""
+        self.assertEqual(stem('Django'), 'django')
+        self.assertEqual(stem('42'), '42')
+
+
+class SearchIndexTest(TestCase):
+    index_class = search.Fts5Index
+
+    def setUp(self):
+        patcher = mock.patch.object(search, '_index', self.index_class())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(username='auth')
+        self.group = Group.objects.create(
+            title='Садовые растения', slug='garden', description='Описание'
+        )
+        self.cat = Post.objects.create(
+            text='Наша кошка ловит мышей', author=self.user
+        )
+        self.cats = Post.objects.create(
+            text='Кошки, кошки и ещё раз кошки', author=self.user
+        )
+        self.rose = Post.objects.create(
+            text='Розы цветут', author=self.user, group=self.group
+        )
+        search.rebuild()
+
+    def test_finds_word_forms(self):
+        """Запрос находит посты с другими формами слова"""
+        self.assertCountEqual(
+            search.search_posts('кошками'), [self.cat.pk, self.cats.pk]
+        )
+
+    def test_ranks_more_matches_first(self):
+        """Пост с большим числом совпадений выше"""
+        self.assertEqual(
+            search.search_posts('кошка'), [self.cats.pk, self.cat.pk]
+        )
+
+    def test_requires_all_words(self):
+        """Пост должен содержать все слова запроса"""
+        self.assertEqual(search.search_posts('кошка мыши'), [self.cat.pk])
+        self.assertEqual(search.search_posts(''), [])
+
+    def test_finds_by_group_title(self):
+        """Посты находятся по названию группы"""
+        self.assertEqual(search.search_posts('садовых'), [self.rose.pk])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при сохранении и удалении"""
+        Comment.objects.create(
+            text='Отличные тюльпаны', author=self.user, post=self.cat
+        )
+        self.assertEqual(search.search_posts('тюльпан'), [self.cat.pk])
+        self.group.title = 'Комнатные растения'
+        self.group.save()
+        self.assertEqual(search.search_posts('комнатные'), [self.rose.pk])
+        self.assertEqual(search.search_posts('садовые'), [])
+        self.cats.text = 'Собаки'
+        self.cats.save()
+        self.assertEqual(search.search_posts('кошка'), [self.cat.pk])
+        self.cat.delete()
+        self.assertEqual(search.search_posts('кошка'), [])
+        self.group.delete()
+        self.assertEqual(search.search_posts('комнатные'), [])
+
+    def test_comments_are_separate_documents(self):
+        """Комментарий индексируется и удаляется отдельно от поста"""
+        first = Comment.objects.create(
+            text='Отличные тюльпаны', author=self.user, post=self.rose
+        )
+        Comment.objects.create(
+            text='Красивые пионы', author=self.user, post=self.rose
+        )
+        self.assertEqual(search.search_posts('тюльпан пион'), [self.rose.pk])
+        self.assertEqual(search.search_posts('розы пионы'), [self.rose.pk])
+        first.delete()
+        self.assertEqual(search.search_posts('тюльпан'), [])
+        self.assertEqual(search.search_posts('пионы'), [self.rose.pk])
+
+    def test_rank_continues_after_key(self):
+        """Выдача продолжается после ключа последнего поста страницы"""
+        ranked = search.rank_posts('кошка')
+        self.assertEqual(
+            [pk for pk, _ in ranked], [self.cats.pk, self.cat.pk]
+        )
+        (first, first_key), (last, last_key) = ranked
+        self.assertEqual(
+            search.rank_posts('кошка', 1, (first_key, first)), ranked[1:]
+        )
+        self.assertEqual(
+            search.rank_posts('кошка', 1, (last_key, last), backwards=True),
+            ranked[:1],
+        )
+
+    def test_rebuild_command(self):
+        """Команда заново строит индекс"""
+        search.get_index().clear()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Постов проиндексировано: 3', out.getvalue())
+        self.assertEqual(search.search_posts('розы'), [self.rose.pk])
+
+
+class PythonSearchIndexTest(SearchIndexTest):
+    """Те же проверки для индекса без FTS5."""
+    index_class = search.PythonIndex
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.posts = Post.objects.bulk_create(
+            Post(text=f'Пост про котов №{i}', author=cls.user)
+            for i in range(PAGINATOR_QUANTITY + 3)
+        )
+        Post.objects.create(text='Пост про собак', author=cls.user)
+        search.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_search_page(self):
+        """Поиск выводит найденные посты постранично"""
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'коты'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), PAGINATOR_QUANTITY)
+        self.assertEqual(page_obj.paginator.count, PAGINATOR_QUANTITY + 3)
+        self.assertTrue(all('котов' in post.text for post in page_obj))
+        self.assertContains(
+            response, f'?q=%D0%BA%D0%BE%D1%82%D1%8B&amp;cursor='
+            f'{page_obj.next_cursor}'
+        )
+        response = self.client.get(
+            url, {'q': 'коты', 'cursor': page_obj.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertEqual(second_page.number, 2)
+        self.assertFalse(set(second_page) & set(page_obj))
+        previous_page = self.client.get(
+            url, {'q': 'коты', 'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(page_obj))
+
+    def test_empty_query(self):
+        """Без запроса страница поиска пуста"""
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через поисковый индекс"""
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
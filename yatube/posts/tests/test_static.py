@@ -0,0 +1,126 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import staticfiles
+from core.middleware import StaticFilesMiddleware
+
+MANIFEST = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+# Подмена brotli: тестам важна не степень сжатия, а наличие копии .br.
+FAKE_BROTLI = SimpleNamespace(compress=zlib.compress)
+
+
+class StaticPipelineTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        with override_settings(STATIC_ROOT=cls.root,
+                               STATICFILES_STORAGE=MANIFEST), \
+                mock.patch.object(staticfiles, 'brotli', FAKE_BROTLI):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(cls.root, 'staticfiles.json')) as manifest:
+            cls.css = json.load(manifest)['paths']['css/bootstrap.min.css']
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        with override_settings(STATIC_SERVE=True, STATIC_ROOT=self.root):
+            self.middleware = StaticFilesMiddleware(
+                lambda request: HttpResponse('view')
+            )
+
+    def get(self, path, **headers):
+        return self.middleware(self.factory.get(path, **headers))
+
+    def test_collectstatic_writes_hashed_and_compressed(self):
+        """collectstatic даёт имена с хешем и сжатые копии"""
+        self.assertRegex(self.css, r'^css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, self.css)
+        with open(path, 'rb') as original, \
+                open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(
+                gzip.decompress(compressed.read()), original.read()
+            )
+        self.assertTrue(os.path.exists(path + '.br'))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.root, 'img', 'logo.png.gz')
+        ))
+
+    def test_hashed_file_cached_forever(self):
+        """Файл с хешем в имени кешируется на год"""
+        response = self.get(f'/static/{self.css}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_plain_name_cached_briefly(self):
+        """Файл без хеша кешируется ненадолго"""
+        with override_settings(STATIC_MAX_AGE=60):
+            response = self.get('/static/css/bootstrap.min.css')
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_encoding_negotiation(self):
+        """Отдаётся лучшая сжатая копия, которую принимает клиент"""
+        cases = (
+            ('gzip, deflate, br', 'br'),
+            ('gzip', 'gzip'),
+            ('gzip, br;q=0', 'gzip'),
+            ('', None),
+        )
+        for header, encoding in cases:
+            with self.subTest(header=header):
+                response = self.get(
+                    f'/static/{self.css}', HTTP_ACCEPT_ENCODING=header
+                )
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+        response = self.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertTrue(content.startswith(b'@charset'))
+
+    def test_not_modified_and_head(self):
+        """If-Modified-Since даёт 304, HEAD — заголовки без тела"""
+        url = f'/static/{self.css}'
+        response = self.get(url)
+        not_modified = self.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        head = self.middleware(self.factory.head(url))
+        self.assertEqual(head.content, b'')
+        self.assertEqual(
+            int(head['Content-Length']),
+            os.path.getsize(os.path.join(self.root, self.css)),
+        )
+
+    def test_unknown_paths_reach_views(self):
+        """Остальные адреса и методы доходят до view"""
+        self.assertEqual(self.get('/static/missing.css').content, b'view')
+        self.assertEqual(self.get('/').content, b'view')
+        response = self.middleware(
+            self.factory.post(f'/static/{self.css}')
+        )
+        self.assertEqual(response.content, b'view')
+
+    def test_disabled_by_default(self):
+        """Без STATIC_SERVE middleware не используется"""
+        with override_settings(STATIC_SERVE=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                StaticFilesMiddleware(lambda request: None)
@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, User
+from ..storage import content_storage, is_hashed
+from .utils import make_upload
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='post_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, text, size=(64, 64)):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': text, 'image': make_upload('photo.jpg', size)},
+        )
+        return Post.objects.get(text=text)
+
+    def test_identical_uploads_are_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с общими миниатюрами"""
+        first = self.create_post('Первый пост')
+        second = self.create_post('Второй пост')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_hashed(first.image.name))
+        _, files = content_storage.listdir(
+            first.image.name.rsplit('/', 1)[0]
+        )
+        self.assertEqual(len(files), 1)
+        thumbnails.generate(first.image.name)
+        thumbnails.prefetch([first, second])
+        self.assertEqual(
+            first.thumbnails['card'].name, second.thumbnails['card'].name
+        )
+        other = self.create_post('Третий пост', size=(80, 64))
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_gc_removes_orphans(self):
+        """Сборщик удаляет картинки без постов и забытые миниатюры"""
+        post = self.create_post('Пост с картинкой')
+        orphan = content_storage.save(
+            'posts/orphan.jpg', make_upload('orphan.jpg', (70, 70))
+        )
+        stale = content_storage.save(
+            'cache/00/00/stale.jpg', ContentFile(b'thumbnail')
+        )
+        legacy = content_storage._save(
+            'posts/legacy.jpg', ContentFile(b'old upload')
+        )
+        out = StringIO()
+        call_command('gc_media', '--dry-run', '--grace=0', stdout=out)
+        self.assertIn('Оригиналов к удалению: 1', out.getvalue())
+        self.assertTrue(content_storage.exists(orphan))
+        call_command('gc_media', '--grace=0', stdout=StringIO())
+        self.assertFalse(content_storage.exists(orphan))
+        self.assertFalse(content_storage.exists(stale))
+        self.assertTrue(content_storage.exists(post.image.name))
+        self.assertTrue(content_storage.exists(legacy))
+
+    def test_gc_keeps_recent_files(self):
+        """Свежие файлы сборщик не трогает"""
+        orphan = content_storage.save(
+            'posts/orphan.jpg', make_upload('orphan.jpg', (70, 70))
+        )
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(content_storage.exists(orphan))
+
+    def test_deleted_post_image_left_to_gc(self):
+        """Картинку последнего удалённого поста убирает сборщик"""
+        first = self.create_post('Первый пост')
+        second = self.create_post('Второй пост')
+        name = first.image.name
+        first.delete()
+        second.delete()
+        self.assertTrue(content_storage.exists(name))
+        call_command('gc_media', '--grace=0', stdout=StringIO())
+        self.assertFalse(content_storage.exists(name))
+
+    def test_reupload_protects_file_from_gc(self):
+        """Повторная загрузка тех же байт освежает файл для сборщика"""
+        name = content_storage.save(
+            'posts/photo.jpg', make_upload('photo.jpg', (64, 64))
+        )
+        os.utime(content_storage.path(name), (0, 0))
+        content_storage.save(
+            'posts/photo.jpg', make_upload('photo.jpg', (64, 64))
+        )
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(content_storage.exists(name))
+
+    def test_concurrent_identical_upload_reuses_name(self):
+        """Загрузка, проигравшая гонку за то же имя, не получает суффикс"""
+        name = content_storage.save(
+            'posts/photo.jpg', make_upload('photo.jpg', (64, 64))
+        )
+        # Первая проверка существования прошла до записи соседа.
+        exists = content_storage.exists
+        checks = iter([lambda name: False])
+        with mock.patch.object(
+            content_storage, 'exists',
+            lambda name: next(checks, exists)(name),
+        ):
+            again = content_storage.save(
+                'posts/photo.jpg', make_upload('photo.jpg', (64, 64))
+            )
+        self.assertEqual(again, name)
+        _, files = content_storage.listdir(name.rsplit('/', 1)[0])
+        self.assertEqual(files, [name.rsplit('/', 1)[1]])
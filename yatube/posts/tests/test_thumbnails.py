@@ -0,0 +1,148 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, User
+from .utils import SynchronousExecutor, make_upload
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='thumbnail.gif',
+                content=SMALL_GIF,
+                content_type='image/gif',
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_rendering_does_not_generate(self):
+        """Без готовой миниатюры шаблон показывает оригинал, не строя её"""
+        with mock.patch.object(thumbnails.ThumbnailBackend, 'get_thumbnail',
+                               autospec=True) as get_thumbnail:
+            response = self.client.get(reverse('posts:index'))
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, self.post.image.url)
+
+    def test_generated_thumbnail_is_shown(self):
+        """После генерации страницы показывают миниатюру"""
+        self.client.get(reverse('posts:index'))
+        thumbnails.generate(self.post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '/media/cache/')
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_prefetch_is_batched(self):
+        """Миниатюры страницы читаются одним запросом, затем из кеша"""
+        thumbnails.generate(self.post.image.name)
+        for i in range(3):
+            Post.objects.create(
+                text=f'Пост №{i}', author=self.user, image=f'posts/{i}.gif'
+            )
+        Post.objects.create(text='Пост без картинки', author=self.user)
+        posts = list(Post.objects.all())
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts)
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+        ready = {post.pk: post.thumbnails['card'] for post in posts}
+        self.assertIn('cache/', ready.pop(self.post.pk).name)
+        self.assertEqual(set(ready.values()), {None})
+
+    @mock.patch.object(thumbnails, 'get_executor')
+    @mock.patch.object(thumbnails.transaction, 'on_commit',
+                       lambda func: func())
+    def test_post_create_enqueues_thumbnails(self, get_executor):
+        """Новый пост с картинкой ставит миниатюры в очередь"""
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Новый пост',
+            'image': make_upload('new.jpg', (40, 40)),
+        })
+        post = Post.objects.get(text='Новый пост')
+        get_executor.return_value.submit.assert_called_once_with(
+            thumbnails.build, post.image.name
+        )
+
+    def test_naming_matches_sorl(self):
+        """NamingBackend даёт те же имена, что и sorl"""
+        for _, geometry, options in thumbnails.THUMBNAILS:
+            with self.subTest(geometry=geometry):
+                built = thumbnails.ThumbnailBackend().get_thumbnail(
+                    self.post.image.name, geometry, **options
+                )
+                named = thumbnails.NamingBackend().get_thumbnail_file(
+                    self.post.image.name, geometry, **options
+                )
+                self.assertEqual(named.name, built.name)
+                self.assertEqual(named.key, built.key)
+
+    def test_runner_waits_for_thumbnails(self):
+        """Оба способа запуска тестов ставят пул, который ждёт задачи"""
+        self.assertIsInstance(thumbnails.get_executor(), SynchronousExecutor)
+
+    def test_warm_command(self):
+        """Команда строит миниатюры для существующих постов"""
+        out = StringIO()
+        call_command('warm_thumbnails', '--workers=1', stdout=out)
+        self.assertIn('Картинок обработано: 1', out.getvalue())
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '/media/cache/')
+
+
+class InjectedExecutorTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.executor = SynchronousExecutor()
+        thumbnails.set_executor(self.executor)
+        self.addCleanup(thumbnails.set_executor, None)
+        self.addCleanup(self.executor.shutdown)
+        self.user = User.objects.create(username='auth')
+        self.client.force_login(self.user)
+
+    def test_injected_executor_builds_thumbnails(self):
+        """Подменённый пул строит миниатюры нового поста после коммита"""
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                self.client.post(reverse('posts:post_create'), {
+                    'text': 'Новый пост',
+                    'image': make_upload('new.jpg', (40, 40)),
+                })
+                response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '/media/cache/', count=1)
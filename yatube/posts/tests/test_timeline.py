@@ -0,0 +1,124 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry, User
+from .utils import commit_callbacks
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='posts_author')
+        cls.follower = User.objects.create(username='follower')
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def get_feed_texts(self):
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_new_post_pushed_to_followers(self):
+        """Новый пост попадает в ленту подписчика"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post).exists())
+        self.assertEqual(self.get_feed_texts(), ['Новый пост'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка заполняет ленту, отписка очищает её"""
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.follower_client.get(
+            reverse('posts:profile_follow', args={self.author.username}))
+        self.assertEqual(self.get_feed_texts(), ['Старый пост'])
+        self.follower_client.get(
+            reverse('posts:profile_unfollow', args={self.author.username}))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists())
+        self.assertEqual(self.get_feed_texts(), [])
+
+    @mock.patch.object(timeline, 'TIMELINE_LENGTH', 2)
+    def test_timeline_is_bounded(self):
+        """Лента хранит не больше TIMELINE_LENGTH записей"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        for i in range(4):
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2)
+        self.assertEqual(self.get_feed_texts(), ['Пост 3', 'Пост 2'])
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 0)
+    def test_popular_author_merged_on_read(self):
+        """Посты популярного автора подмешиваются при чтении ленты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.create(author=self.author, text='Популярный пост')
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists())
+        self.assertEqual(self.get_feed_texts(), ['Популярный пост'])
+
+    @mock.patch.object(timeline, 'FANOUT_LIMIT', 1)
+    def test_author_no_longer_popular_is_fanned_out(self):
+        """Посты, написанные в популярности, раскладываются после отписок"""
+        other = User.objects.create(username='other_follower')
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        Post.objects.create(author=self.author, text='Популярный пост')
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists())
+        with commit_callbacks():
+            Follow.objects.filter(user=other).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.follower).exists())
+        self.assertEqual(self.get_feed_texts(), ['Популярный пост'])
+
+    def test_feed_ties_ordered_by_post_id(self):
+        """Из постов с равной датой в ленту попадают самые новые"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        TimelineEntry.objects.update(pub_date=posts[0].pub_date)
+        with mock.patch.object(timeline, 'TIMELINE_LENGTH', 2):
+            feed = timeline.get_feed(self.follower)
+        self.assertEqual(
+            set(feed.values_list('pk', flat=True)),
+            {posts[2].pk, posts[1].pk},
+        )
+
+    @mock.patch.object(timeline, 'TIMELINE_LENGTH', 2)
+    def test_trim_keeps_ties_at_boundary(self):
+        """Обрезка по (pub_date, post_id) не задевает равные по дате посты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        Post.objects.update(pub_date=posts[0].pub_date)
+        TimelineEntry.objects.update(pub_date=posts[0].pub_date)
+        timeline.trim([self.follower.pk])
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.follower).values_list('post_id', flat=True)),
+            {posts[3].pk, posts[2].pk},
+        )
+
+    def test_rebuild_command_fills_existing_follows(self):
+        """rebuild_timelines заполняет ленты по уже существующим подпискам"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.create(author=self.author, text='Старый пост')
+        TimelineEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_timelines', stdout=out)
+        self.assertIn('Записей в лентах: 1', out.getvalue())
+        self.assertEqual(self.get_feed_texts(), ['Старый пост'])
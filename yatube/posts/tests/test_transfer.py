@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import search, transfer
+from ..models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, UserCounters
+)
+
+PUB_DATE = datetime(2020, 5, 17, 12, 30, tzinfo=timezone.utc)
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            text='Пост про кошек', author=self.author, group=self.group
+        )
+        Post.objects.filter(pk=self.post.pk).update(pub_date=PUB_DATE)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.post
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def export(self, kind, name):
+        call_command(
+            'export_data', kind, self.path(name),
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def load(self, kind, name, *args):
+        out = StringIO()
+        call_command(
+            'import_data', kind, self.path(name), *args,
+            stdout=out, stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def test_round_trip(self):
+        """Выгруженные данные загружаются обратно со всеми связями"""
+        for extension in ('jsonl', 'csv'):
+            with self.subTest(format=extension):
+                for kind in ('posts', 'comments', 'follows'):
+                    self.export(kind, f'{kind}.{extension}')
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                self.assertFalse(TimelineEntry.objects.exists())
+                for kind in ('posts', 'comments', 'follows'):
+                    output = self.load(kind, f'{kind}.{extension}')
+                    self.assertIn('Загружено строк: 1', output)
+                    self.assertIn('строк/с', output)
+                post = Post.objects.get()
+                self.assertEqual(post.pk, self.post.pk)
+                self.assertEqual(post.pub_date, PUB_DATE)
+                self.assertEqual(post.group, self.group)
+                self.assertEqual(post.comments_count, 1)
+                self.assertEqual(post.comments.get().author, self.reader)
+                self.assertEqual(
+                    UserCounters.objects.get(user=self.author).followers_count,
+                    1,
+                )
+                self.assertTrue(TimelineEntry.objects.filter(
+                    user=self.reader, post=post
+                ).exists())
+                self.assertEqual(search.search_posts('кошек'), [post.pk])
+
+    def test_unknown_users(self):
+        """Строки с неизвестными авторами пропускаются или создают их"""
+        with open(self.path('posts.jsonl'), 'w') as stream:
+            stream.write('{"author": "newcomer", "text": "Первый"}\n')
+        self.load('posts', 'posts.jsonl', '--no-rebuild')
+        self.assertFalse(Post.objects.filter(text='Первый').exists())
+        self.load('posts', 'posts.jsonl', '--create-users')
+        post = Post.objects.get(text='Первый')
+        self.assertEqual(post.author.username, 'newcomer')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.author.counters.posts_count, 1)
+
+    def test_broken_file(self):
+        """Битая строка останавливает загрузку с понятной ошибкой"""
+        with open(self.path('posts.jsonl'), 'w') as stream:
+            stream.write('{"author": "author", "text": "Пост"}\n{oops\n')
+        with self.assertRaises(CommandError):
+            self.load('posts', 'posts.jsonl', '--batch-size', '1')
+        self.assertTrue(Post.objects.filter(text='Пост').exists())
+
+    def test_duplicate_id_rejected(self):
+        """Занятый id отвергает только свою строку, остальные загружаются"""
+        with open(self.path('posts.jsonl'), 'w') as stream:
+            stream.write(
+                f'{{"id": {self.post.pk}, "author": "author", '
+                f'"text": "Дубль"}}\n'
+                '{"author": "author", "text": "Новый"}\n'
+            )
+        err = StringIO()
+        call_command(
+            'import_data', 'posts', self.path('posts.jsonl'),
+            stdout=StringIO(), stderr=err,
+        )
+        self.assertIn(f'id {self.post.pk} отвергнута', err.getvalue())
+        self.assertTrue(Post.objects.filter(text='Новый').exists())
+        self.assertFalse(Post.objects.filter(text='Дубль').exists())
+
+    def test_keep_dates_restored_on_error(self):
+        """auto_now_add возвращается, даже если загрузка упала"""
+        with self.assertRaises(RuntimeError), transfer.keep_dates(Post):
+            raise RuntimeError
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
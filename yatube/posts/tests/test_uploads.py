@@ -0,0 +1,119 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+from ..uploads import StreamingImageUploadHandler
+from .utils import make_upload
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class StreamingUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='post_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    def make_handler(self):
+        handler = StreamingImageUploadHandler(RequestFactory().post('/'))
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+        return handler
+
+    def test_non_image_rejected(self):
+        """Файл, который не начинается как изображение, отклоняется"""
+        response = self.create_post(SimpleUploadedFile(
+            'photo.jpg', b'<?php echo "hello"; ?>', 'image/jpeg'
+        ))
+        errors = response.context['form'].errors['image']
+        self.assertIn('Загрузите изображение', errors[0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_oversize_rejected(self):
+        """Слишком большой файл отклоняется"""
+        response = self.create_post(make_upload('photo.jpg', (64, 64)))
+        errors = response.context['form'].errors['image']
+        self.assertIn('Файл больше', errors[0])
+        self.assertFalse(Post.objects.exists())
+
+    def test_image_accepted(self):
+        """Изображение проходит проверки и сохраняется"""
+        self.create_post(make_upload('photo.jpg', (64, 64)))
+        self.assertTrue(Post.objects.exclude(image='').exists())
+
+    def test_chunks_streamed_to_disk_and_hashed(self):
+        """Части файла пишутся на диск, хеш считается по ходу приёма"""
+        data = make_upload('photo.jpg', (64, 64)).read()
+        handler = self.make_handler()
+        for start in range(0, len(data), 5):
+            handler.receive_data_chunk(data[start:start + 5], start)
+        upload = handler.file_complete(len(data))
+        self.assertTrue(os.path.exists(upload.temporary_file_path()))
+        self.assertEqual(upload.sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual(upload.read(), data)
+
+    def test_animation_stored_under_streamed_digest(self):
+        """Анимация хранится под хешем, посчитанным при приёме"""
+        buffer = BytesIO()
+        first, second = (
+            Image.new('RGB', (32, 32), color) for color in ('red', 'blue')
+        )
+        first.save(buffer, 'GIF', save_all=True, append_images=[second])
+        data = buffer.getvalue()
+        with mock.patch('posts.storage.hashlib') as storage_hashlib:
+            self.create_post(SimpleUploadedFile('anim.gif', data, 'image/gif'))
+        storage_hashlib.sha256.assert_not_called()
+        digest = hashlib.sha256(data).hexdigest()
+        self.assertTrue(Post.objects.get().image.name.endswith(
+            f'/{digest[:2]}/{digest}.gif'
+        ))
+
+    def test_first_chunk_decides(self):
+        """Чужой тип отклоняется по первой же части"""
+        handler = self.make_handler()
+        with self.assertRaises(SkipFile):
+            handler.receive_data_chunk(b'%PDF-1.7 ' * 100, 0)
+        self.assertIn('image', handler.request.upload_errors)
+
+    def test_handler_only_on_post_forms(self):
+        """Обработчик ставят только формы поста, и CSRF там проверяется"""
+        handlers = RequestFactory().post('/').upload_handlers
+        self.assertFalse(any(
+            isinstance(handler, StreamingImageUploadHandler)
+            for handler in handlers
+        ))
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост', 'image': make_upload('a.jpg', (8, 8))},
+        )
+        self.assertTemplateUsed(response, 'core/403.html')
+        self.assertFalse(Post.objects.exists())
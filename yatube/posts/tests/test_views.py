@@ -1,15 +1,27 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django import forms
 
+from ..caching import (
+    SITE, get_stats, get_versions, page_key, version_key
+)
 from ..models import Comment, Group, Post, User, Follow
-from ..servises import PAGINATOR_QUANTITY
+from ..servises import COMMENTS_QUANTITY, PAGINATOR_QUANTITY, get_comments
+from .utils import commit_callbacks
 
 POSTS_ON_SECOND_PAGE = 3
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -51,6 +63,11 @@ class PostPagesTests(TestCase):
             post=PostPagesTests.post,
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
     def setUp(self):
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -109,6 +126,7 @@ class PostPagesTests(TestCase):
         self.assertFalse(response.context['page_obj'])
         for reverse_page, object in context.items():
             with self.subTest(reverse_page=reverse_page):
+                cache.clear()
                 response = self.authorized_client.get(reverse_page)
                 group_object = response.context['group']
                 self.assertEqual(group_object.title, object.title)
@@ -193,27 +211,41 @@ class PaginatorViewsTest(TestCase):
 
     def test_paginator_on_pages(self):
         """На страницах выводиться правильное количество постов"""
-        context = {
-            reverse('posts:index'): PAGINATOR_QUANTITY,
-            reverse('posts:index') + '?page=2': POSTS_ON_SECOND_PAGE,
-            reverse(
-                'posts:group_list', args={self.group.slug}
-            ): PAGINATOR_QUANTITY,
-            reverse(
-                'posts:group_list', args={self.group.slug}
-            ) + '?page=2': POSTS_ON_SECOND_PAGE,
-            reverse(
-                'posts:profile', args={self.user.username}
-            ): PAGINATOR_QUANTITY,
-            reverse(
-                'posts:profile', args={self.user.username}
-            ) + '?page=2': POSTS_ON_SECOND_PAGE,
-        }
-        for reverse_page, len_posts in context.items():
-            with self.subTest(reverse=reverse):
-                self.assertEqual(len(
-                    self.client.get(reverse_page).context.get('page_obj')
-                ), len_posts)
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args={self.group.slug}),
+            reverse('posts:profile', args={self.user.username}),
+        )
+        for reverse_page in pages:
+            with self.subTest(reverse_page=reverse_page):
+                first_page = self.client.get(
+                    reverse_page).context.get('page_obj')
+                self.assertEqual(len(first_page), PAGINATOR_QUANTITY)
+                second_page = self.client.get(
+                    reverse_page, {'cursor': first_page.next_cursor}
+                ).context.get('page_obj')
+                self.assertEqual(len(second_page), POSTS_ON_SECOND_PAGE)
+                self.assertEqual(second_page.number, 2)
+                self.assertFalse(second_page.has_next())
+
+    def test_paginator_previous_cursor(self):
+        """Курсор назад возвращает предыдущую страницу"""
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        second_page = self.client.get(
+            url, {'cursor': first_page.next_cursor}).context['page_obj']
+        previous_page = self.client.get(
+            url, {'cursor': second_page.previous_cursor}).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertFalse(previous_page.has_previous())
+
+    def test_paginator_invalid_cursor(self):
+        """Некорректный курсор открывает первую страницу"""
+        page = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        ).context['page_obj']
+        self.assertEqual(page.number, 1)
+        self.assertEqual(len(page), PAGINATOR_QUANTITY)
 
 
 class CacheIndexPageTest(TestCase):
@@ -223,23 +255,264 @@ class CacheIndexPageTest(TestCase):
         cls.user = User.objects.create(
             username='posts_author',
         )
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='test-slug',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Пост №1',
+            author=cls.user,
+            group=cls.group,
+        )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.guest_client.force_login(self.user)
 
     def test_cache(self):
-        """Список постов на главной странице храниться в кеше"""
-        content = self.guest_client.get(reverse('posts:index')).content
+        """Страницы отдаются из кеша, пока данные не изменились"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args={self.group.slug}),
+            reverse('posts:profile', args={self.user.username}),
+            reverse('posts:post_detail', args={self.post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                content = self.guest_client.get(url).content
+                with self.assertNumQueries(2):
+                    content_1 = self.guest_client.get(url).content
+                self.assertEqual(content, content_1)
+
+    def test_cache_invalidated_by_new_post(self):
+        """Новый пост сразу виден в лентах"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args={self.group.slug}),
+            reverse('posts:profile', args={self.user.username}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
         Post.objects.create(
-            text='Пост №1',
+            text='Пост №2',
             author=self.user,
+            group=self.group,
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Пост №2')
+
+    def test_cache_invalidated_by_comment(self):
+        """Новый комментарий сразу виден на странице поста"""
+        url = reverse('posts:post_detail', args={self.post.id})
+        self.guest_client.get(url)
+        Comment.objects.create(
+            text='Новый комментарий',
+            author=self.user,
+            post=self.post,
+        )
+        self.assertContains(self.guest_client.get(url), 'Новый комментарий')
+
+    def test_versions_bumped_again_after_commit(self):
+        """После коммита версии меняются ещё раз"""
+        with commit_callbacks():
+            Post.objects.create(text='Пост №2', author=self.user)
+            during_transaction = get_versions(['feed'])[0]
+            self.assertEqual(get_stats()[('invalidations', 'feed')], 0)
+        self.assertGreater(get_versions(['feed'])[0], during_transaction)
+        self.assertEqual(get_stats()[('invalidations', 'feed')], 1)
+
+    @override_settings(CACHE_PROCESS_LOCAL=True, PAGE_CACHE_TIMEOUT=20)
+    def test_process_local_versions_expire(self):
+        """В кеше процесса версии живут не дольше страниц"""
+        versions = get_versions(['feed'])
+        later = time.time() + 21
+        with mock.patch('time.time', return_value=later):
+            self.assertNotEqual(get_versions(['feed']), versions)
+
+    @override_settings(CACHE_PROCESS_LOCAL=False)
+    def test_shared_versions_kept(self):
+        """В общем кеше версии хранятся, пока их не сменят"""
+        versions = get_versions(['feed'])
+        later = time.time() + 60 * 60 * 24
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(get_versions(['feed']), versions)
+
+    def test_cache_stats(self):
+        """Попадания и промахи кеша учитываются"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.guest_client.get(url)
+        stats = get_stats()
+        self.assertEqual(stats[('misses', 'index')], 1)
+        self.assertEqual(stats[('hits', 'index')], 1)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='posts_author')
+        cls.post = Post.objects.create(text='Пост №1', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        # Последние изменения были раньше текущей секунды.
+        scopes = (SITE, 'feed', f'post:{self.post.pk}',
+                  f'profile:{self.user.username}')
+        cache.set_many(
+            {version_key(scope): time.time() - 2 for scope in scopes}, None
+        )
+        self.guest_client = Client()
+        self.url = reverse('posts:post_detail', args={self.post.id})
+
+    def test_validators(self):
+        """Страницы отдают ETag, Last-Modified и требуют перепроверки"""
+        response = self.guest_client.get(self.url)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('private', response['Cache-Control'])
+        self.guest_client.force_login(self.user)
+        response = self.guest_client.get(
+            reverse('posts:profile', args={self.user.username})
+        )
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_not_modified(self):
+        """Неизменившаяся страница отдаётся как 304 без запросов к БД"""
+        response = self.guest_client.get(self.url)
+        with self.assertNumQueries(0):
+            not_modified = self.guest_client.get(
+                self.url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        not_modified = self.guest_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_not_modified_without_rendering(self):
+        """Без depend_on 304 отдаётся до вызова view и без страницы в кеше"""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        key = page_key(
+            'index', RequestFactory().get(url), 'anonymous',
+            get_versions([SITE, 'feed']),
+        )
+        cache.delete(key)
+        with self.assertNumQueries(0):
+            not_modified = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(get_stats()[('misses', 'index')], 1)
+
+    def test_no_last_modified_in_same_second(self):
+        """Пока идёт секунда последней записи, Last-Modified не отдаётся"""
+        last_modified = self.guest_client.get(self.url)['Last-Modified']
+        Comment.objects.create(
+            text='Новый комментарий', author=self.user, post=self.post,
+        )
+        response = self.guest_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=last_modified
         )
-        content_1 = self.guest_client.get(reverse('posts:index')).content
-        self.assertEqual(content, content_1)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_modified_by_comment(self):
+        """После нового комментария ETag меняется"""
+        etag = self.guest_client.get(self.url)['ETag']
+        Comment.objects.create(
+            text='Новый комментарий', author=self.user, post=self.post,
+        )
+        response = self.guest_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Новый комментарий')
+
+
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='commentator')
+        cls.post = Post.objects.create(text='Популярный пост', author=cls.user)
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_QUANTITY + 5)
+        ])
+
+    def setUp(self):
         cache.clear()
-        content_2 = self.guest_client.get(reverse('posts:index')).content
-        self.assertNotEqual(content_1, content_2)
+        self.url = reverse('posts:post_detail', args={self.post.id})
+
+    def test_first_page(self):
+        """На странице поста первая порция комментариев и «Показать ещё»"""
+        response = self.client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_QUANTITY)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(
+            response, reverse('posts:post_comments', args={self.post.id})
+        )
+
+    def test_load_more_fragment(self):
+        """Фрагмент отдаёт следующие комментарии без остальной страницы"""
+        cursor = self.client.get(self.url).context['comments'].next_cursor
+        response = self.client.get(
+            reverse('posts:post_comments', args={self.post.id}),
+            {'cursor': cursor},
+        )
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertContains(response, f'Комментарий {COMMENTS_QUANTITY}')
+        self.assertNotContains(response, 'Комментарий 0<')
+        self.assertNotContains(response, 'data-load-more')
+        self.assertNotContains(response, '<html')
+
+    def test_first_page_shared_and_invalidated(self):
+        """Первая страница общая для всех, пока не добавлен комментарий"""
+        with commit_callbacks():
+            self.client.get(self.url)
+        reader = Client()
+        reader.force_login(self.user)
+        # Сессия, пользователь и пост; комментарии — из кеша.
+        with self.assertNumQueries(3):
+            reader.get(self.url)
+        reader.post(
+            reverse('posts:add_comment', args={self.post.id}),
+            {'text': 'Свежий'},
+        )
+        with self.assertNumQueries(4):
+            reader.get(self.url)
+
+    def test_first_page_follows_author_rename(self):
+        """Новое имя автора комментария видно сразу после переименования"""
+        with commit_callbacks():
+            get_comments(self.post)
+        self.user.username = 'renamed'
+        with commit_callbacks():
+            self.user.save()
+        self.assertEqual(
+            get_comments(self.post)[0].author.username, 'renamed'
+        )
+
+    def test_first_page_cached_after_commit(self):
+        """Страница попадает в кеш только после коммита транзакции"""
+        get_comments(self.post)
+        with self.assertNumQueries(1):
+            get_comments(self.post)
+        with commit_callbacks():
+            get_comments(self.post)
+        with self.assertNumQueries(0):
+            get_comments(self.post)
 
 
 class FollowViewsTest(TestCase):
@@ -0,0 +1,193 @@
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+EXIF_ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+
+@contextmanager
+def commit_callbacks():
+    """Выполняет on_commit-обработчики блока, как после коммита.
+
+    TestCase не коммитит свою транзакцию, а captureOnCommitCallbacks
+    появился только в Django 3.2.
+    """
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, callback in callbacks:
+            callback()
+
+
+class SynchronousExecutor(ThreadPoolExecutor):
+    """Пул для posts.thumbnails.set_executor, который ждёт каждую задачу.
+
+    Задача идёт в отдельном потоке, как в работе, но тест продолжается
+    только после неё.
+    """
+
+    def __init__(self):
+        super().__init__(max_workers=1, thread_name_prefix='thumbnails')
+
+    def submit(self, *args, **kwargs):
+        future = super().submit(*args, **kwargs)
+        wait([future])
+        return future
+
+
+@contextmanager
+def synchronous_thumbnails():
+    """Миниатюры строятся до конца теста, пока жив его MEDIA_ROOT."""
+    from .. import thumbnails
+
+    executor = SynchronousExecutor()
+    thumbnails.set_executor(executor)
+    try:
+        yield executor
+    finally:
+        thumbnails.set_executor(None)
+        executor.shutdown()
+
+
+class QueryBudgetMixin:
+    """Проверки числа SQL-запросов, которые делает страница."""
+
+    def get_queries(self, client, url, method='get', data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data or {})
+        return response, context.captured_queries
+
+    def assertQueryBudget(self, client, url, budget, method='get',
+                          data=None):
+        """Страница укладывается в budget запросов."""
+        response, queries = self.get_queries(client, url, method, data)
+        self.assertLessEqual(len(queries), budget, (
+            f'{method.upper()} {url}: {len(queries)} запросов '
+            f'при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries)
+        ))
+        return response
+
+
+class MemcachedStandIn(socketserver.ThreadingTCPServer):
+    """Память вместо memcached: подмножество текстового протокола."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), MemcachedHandler)
+        self.data = {}
+        self.commands = []
+        self.lock = threading.Lock()
+
+    @property
+    def location(self):
+        return '%s:%s' % self.server_address
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def lookup(self, key):
+        flags, expires, data = self.data.get(key, (0, None, None))
+        if expires is not None and expires <= time.time():
+            self.data.pop(key)
+            return None
+        return None if data is None else (flags, expires, data)
+
+
+class MemcachedHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        for line in self.rfile:
+            command, *args = line.decode().split()
+            server.commands.append(command)
+            with server.lock:
+                reply = getattr(self, f'do_{command}')(server, *args)
+            self.wfile.write(reply)
+
+    @staticmethod
+    def expires(exptime):
+        exptime = int(exptime)
+        if exptime == 0:
+            return None
+        return exptime if exptime > 60 * 60 * 24 * 30 else (
+            time.time() + exptime
+        )
+
+    def do_get(self, server, *keys):
+        reply = b''
+        for key in keys:
+            entry = server.lookup(key)
+            if entry is not None:
+                flags, _, data = entry
+                reply += b'VALUE %s %d %d\r\n%s\r\n' % (
+                    key.encode(), flags, len(data), data
+                )
+        return reply + b'END\r\n'
+
+    def do_set(self, server, key, flags, exptime, length, add=False):
+        data = self.rfile.read(int(length) + 2)[:-2]
+        if add and server.lookup(key) is not None:
+            return b'NOT_STORED\r\n'
+        server.data[key] = (int(flags), self.expires(exptime), data)
+        return b'STORED\r\n'
+
+    def do_add(self, server, *args):
+        return self.do_set(server, *args, add=True)
+
+    def do_delete(self, server, key):
+        found = server.lookup(key) is not None
+        server.data.pop(key, None)
+        return b'DELETED\r\n' if found else b'NOT_FOUND\r\n'
+
+    def do_incr(self, server, key, delta, sign=1):
+        entry = server.lookup(key)
+        if entry is None:
+            return b'NOT_FOUND\r\n'
+        flags, expires, data = entry
+        value = max(int(data) + sign * int(delta), 0)
+        server.data[key] = (flags, expires, str(value).encode())
+        return b'%d\r\n' % value
+
+    def do_decr(self, server, key, delta):
+        return self.do_incr(server, key, delta, sign=-1)
+
+    def do_touch(self, server, key, exptime):
+        entry = server.lookup(key)
+        if entry is None:
+            return b'NOT_FOUND\r\n'
+        server.data[key] = (entry[0], self.expires(exptime), entry[2])
+        return b'TOUCHED\r\n'
+
+    def do_flush_all(self, server):
+        server.data.clear()
+        return b'OK\r\n'
+
+
+def make_upload(name, size, orientation=None):
+    """JPEG-файл для формы, при желании с ориентацией в EXIF."""
+    buffer = BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[EXIF_ORIENTATION] = orientation
+    Image.new('RGB', size, color=(200, 30, 30)).save(
+        buffer, 'JPEG', exif=exif.tobytes()
+    )
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
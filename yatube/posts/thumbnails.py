@@ -0,0 +1,150 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import profiling
+from core.db import router
+
+from . import caching
+from .models import Post
+from .signals import post_scopes
+
+# Миниатюры, которые показывают шаблоны posts: имя, размер, параметры.
+THUMBNAILS = (
+    ('card', '960x339', {'crop': 'center', 'upscale': True}),
+)
+WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class NamingBackend(ThumbnailBackend):
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile миниатюры без обращений к хранилищу и KV store.
+
+        Повторяет начало ThumbnailBackend.get_thumbnail на закрытых
+        методах sorl, поэтому версия sorl-thumbnail закреплена
+        в requirements.txt, а совпадение имён проверяют тесты.
+        """
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+def get_raw_values(keys):
+    """Сырые значения KV store sorl: кеш разом, остальное одним запросом."""
+    kv_cache = default.kvstore.cache
+    values = kv_cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        # Как и sorl, запоминаем и отсутствие значения.
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kv_cache.set_many(fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        key: value for key, value in values.items()
+        if value != EMPTY_VALUE
+    }
+
+
+@profiling.timer('thumbnails')
+def prefetch(posts):
+    """Прикрепляет к постам готовые миниатюры: post.thumbnails[name].
+
+    Отсутствующие миниатюры равны None — шаблон покажет оригинал.
+    """
+    backend = NamingBackend()
+    wanted = []
+    for post in posts:
+        post.thumbnails = dict.fromkeys(name for name, *_ in THUMBNAILS)
+        if not post.image:
+            continue
+        for name, geometry, options in THUMBNAILS:
+            thumbnail = backend.get_thumbnail_file(
+                post.image.name, geometry, **options
+            )
+            wanted.append((post, name, add_prefix(thumbnail.key)))
+    keys = list({key for _, _, key in wanted})
+    if isinstance(default.kvstore, CachedDBKVStore):
+        values = get_raw_values(keys)
+    else:
+        values = {key: default.kvstore._get_raw(key) for key in keys}
+    for post, name, key in wanted:
+        if values.get(key) is not None:
+            post.thumbnails[name] = deserialize_image_file(values[key])
+
+
+@profiling.timer('thumbnails')
+def generate(name):
+    """Строит миниатюры всех размеров и сбрасывает страницы с картинкой."""
+    backend = ThumbnailBackend()
+    for _, geometry, options in THUMBNAILS:
+        backend.get_thumbnail(name, geometry, **options)
+    # Страницы, отрисованные до готовности миниатюр, показывают оригинал.
+    posts = Post.objects.filter(image=name).select_related('author', 'group')
+    for post in posts:
+        caching.invalidate(*post_scopes(post))
+
+
+def build(name):
+    """generate() в потоке пула: соединения с БД потоку больше не нужны.
+
+    Пост мог ещё не дойти до реплик, поэтому чтение из основной базы.
+    """
+    try:
+        with router.primary():
+            generate(name)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=WORKERS, thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def set_executor(executor):
+    """Подменяет пул, в котором строятся миниатюры; None — пул по умолчанию.
+
+    Тесты ставят исполнитель, который дожидается задачи: иначе сборка
+    пишет во временный MEDIA_ROOT, который тест уже удаляет.
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def enqueue(image):
+    """После коммита ставит построение миниатюр image в очередь пула."""
+    if image:
+        name = image.name
+        transaction.on_commit(lambda: get_executor().submit(build, name))
@@ -0,0 +1,176 @@
+from itertools import groupby, islice
+
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+TIMELINE_LENGTH = 500
+FANOUT_LIMIT = 1000
+BATCH_SIZE = 1000
+
+
+def is_popular(author_id):
+    """Посты популярных авторов не раскладываются по лентам."""
+    return UserCounters.objects.filter(
+        user_id=author_id, followers_count__gt=FANOUT_LIMIT
+    ).exists()
+
+
+def trim(user_ids):
+    """Обрезает ленты пользователей до TIMELINE_LENGTH записей.
+
+    Граница — пара (pub_date, post_id), как у курсора ленты: посты,
+    опубликованные в одну секунду с первой лишней записью, не удаляются
+    вместе с ней.
+    """
+    overflow = TimelineEntry.objects.filter(
+        user=OuterRef('user')
+    ).order_by('-pub_date', '-post_id')[TIMELINE_LENGTH:TIMELINE_LENGTH + 1]
+    cutoff_date = Subquery(overflow.values('pub_date'))
+    TimelineEntry.objects.filter(
+        Q(pub_date__lt=cutoff_date)
+        | Q(pub_date=cutoff_date, post_id__lte=Subquery(
+            overflow.values('post_id')
+        )),
+        user_id__in=user_ids,
+    ).delete()
+
+
+def push_post(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    follower_ids = list(
+        Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True)
+    )
+    if not follower_ids:
+        return
+    TimelineEntry.objects.bulk_create(
+        TimelineEntry(
+            user_id=user_id,
+            post=post,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in follower_ids
+    )
+    trim(follower_ids)
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними постами нового автора из подписок."""
+    if is_popular(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )[:TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ),
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def fan_out(author_id, user_ids, ignore_conflicts=False):
+    """Раскладывает последние посты автора по лентам user_ids пачками."""
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list(
+            'id', 'pub_date'
+        )[:TIMELINE_LENGTH]
+    )
+    entries = (
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in user_ids
+        for post_id, pub_date in posts
+    )
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            batch, ignore_conflicts=ignore_conflicts
+        )
+
+
+def rebuild():
+    """Заново раскладывает посты по лентам всех подписчиков.
+
+    Подписки читаются по одному автору за раз, так что память не растёт
+    с их числом. Возвращает число записей в лентах.
+    """
+    TimelineEntry.objects.all().delete()
+    follows = Follow.objects.exclude(
+        author__counters__followers_count__gt=FANOUT_LIMIT
+    ).order_by('author_id').values_list('author_id', 'user_id')
+    for author_id, rows in groupby(
+        follows.iterator(chunk_size=BATCH_SIZE), key=lambda row: row[0]
+    ):
+        fan_out(author_id, (user_id for _, user_id in rows))
+    user_ids = TimelineEntry.objects.order_by().values_list(
+        'user_id', flat=True
+    ).distinct()
+    for start in range(0, user_ids.count(), BATCH_SIZE):
+        trim(list(user_ids[start:start + BATCH_SIZE]))
+    return TimelineEntry.objects.count()
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def catch_up(author_id):
+    """Раскладывает посты автора, который перестал быть популярным.
+
+    Пока подписчиков было больше FANOUT_LIMIT, его посты не попадали
+    в ленты, а подмешивались при чтении. Вызывается после отписки:
+    ровно FANOUT_LIMIT подписчиков значит, что граница только что
+    пройдена. Уже разложенные посты пропускаются.
+    """
+    if not UserCounters.objects.filter(
+        user_id=author_id, followers_count=FANOUT_LIMIT
+    ).exists():
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        )
+    )
+    fan_out(author_id, follower_ids, ignore_conflicts=True)
+    trim(follower_ids)
+
+
+def get_popular_following(user):
+    """Популярные авторы из подписок, их посты подмешиваются при чтении."""
+    return list(
+        Follow.objects.filter(
+            user=user, author__counters__followers_count__gt=FANOUT_LIMIT
+        ).values_list('author_id', flat=True)
+    )
+
+
+def get_feed(user):
+    """Посты ленты подписок пользователя."""
+    post_ids = TimelineEntry.objects.filter(user=user).order_by(
+        '-pub_date', '-post_id'
+    ).values_list('post_id', flat=True)[:TIMELINE_LENGTH]
+    query = Q(id__in=list(post_ids))
+    popular = get_popular_following(user)
+    if popular:
+        query |= Q(author_id__in=popular)
+    return Post.objects.filter(query)
@@ -0,0 +1,292 @@
+import csv
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+BATCH_SIZE = 1000
+# Сколько значений передавать в один IN (...): у SQLite есть предел.
+LOOKUP_SIZE = 500
+
+# Колонка файла и путь к значению в values_list().
+Kind = namedtuple('Kind', ('model', 'columns', 'paths'))
+KINDS = {
+    'posts': Kind(
+        Post,
+        ('id', 'author', 'group', 'text', 'pub_date', 'image',
+         'image_width', 'image_height', 'image_variants'),
+        ('id', 'author__username', 'group__slug', 'text', 'pub_date',
+         'image', 'image_width', 'image_height', 'image_variants'),
+    ),
+    'comments': Kind(
+        Comment,
+        ('id', 'post', 'author', 'text', 'created'),
+        ('id', 'post_id', 'author__username', 'text', 'created'),
+    ),
+    'follows': Kind(
+        Follow,
+        ('user', 'author'),
+        ('user__username', 'author__username'),
+    ),
+}
+
+
+def guess_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_rows(kind, batch_size=BATCH_SIZE):
+    """Строки выгрузки по одной, не загружая таблицу в память."""
+    model, columns, paths = KINDS[kind]
+    rows = model.objects.order_by('pk').values_list(*paths)
+    for row in rows.iterator(chunk_size=batch_size):
+        yield dict(zip(columns, row))
+
+
+def write_rows(rows, stream, file_format, columns):
+    """Пишет строки в stream и возвращает их число."""
+    written = 0
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+        return written
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False, cls=DjangoJSONEncoder)
+        stream.write(line + '\n')
+        written += 1
+    return written
+
+
+def read_rows(stream, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def value(row, column):
+    """Значение колонки; пустая строка CSV означает NULL."""
+    result = row.get(column)
+    return None if result == '' else result
+
+
+def to_int(raw):
+    return None if raw is None else int(raw)
+
+
+def to_datetime(raw):
+    """Дата из файла; без даты строка получает текущее время."""
+    if raw is None:
+        return timezone.now()
+    result = parse_datetime(raw)
+    if result is None:
+        raise ValueError(f'Некорректная дата: {raw}')
+    if timezone.is_naive(result):
+        result = timezone.make_aware(result)
+    return result
+
+
+@contextmanager
+def keep_dates(model):
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты из файла."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    try:
+        for field in fields:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Превращает строки файла в объекты, разрешая имена через словари.
+
+    Пользователи и группы загружаются в память один раз, поэтому
+    на пачку строк приходится один INSERT, а для комментариев ещё
+    один запрос проверки постов.
+    """
+
+    def __init__(self, kind, create_users=False):
+        self.kind = kind
+        self.model = KINDS[kind].model
+        self.create_users = create_users
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.skipped = 0
+        self.unknown = set()
+        self.rejected = {}
+
+    def add_users(self, rows):
+        """Создаёт одним запросом авторов, которых ещё нет в базе."""
+        columns = ('user', 'author') if self.kind == 'follows' else (
+            'author',
+        )
+        names = {
+            value(row, column) for row in rows for column in columns
+        } - set(self.users) - {None}
+        if not names:
+            return
+        users = []
+        for name in sorted(names):
+            user = User(username=name)
+            user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        for chunk in chunked(sorted(names), LOOKUP_SIZE):
+            self.users.update(
+                User.objects.filter(username__in=chunk).values_list(
+                    'username', 'pk'
+                )
+            )
+
+    def user_id(self, row, column):
+        name = value(row, column)
+        if name not in self.users:
+            self.unknown.add(name)
+            raise LookupError(name)
+        return self.users[name]
+
+    def build_post(self, row):
+        slug = value(row, 'group')
+        if slug is not None and slug not in self.groups:
+            self.unknown.add(slug)
+            raise LookupError(slug)
+        return Post(
+            id=to_int(value(row, 'id')),
+            author_id=self.user_id(row, 'author'),
+            group_id=self.groups.get(slug),
+            text=row['text'],
+            pub_date=to_datetime(value(row, 'pub_date')),
+            image=value(row, 'image') or '',
+            image_width=to_int(value(row, 'image_width')),
+            image_height=to_int(value(row, 'image_height')),
+            image_variants=value(row, 'image_variants') or '',
+        )
+
+    def build_comment(self, row):
+        return Comment(
+            id=to_int(value(row, 'id')),
+            post_id=to_int(value(row, 'post')),
+            author_id=self.user_id(row, 'author'),
+            text=row['text'],
+            created=to_datetime(value(row, 'created')),
+        )
+
+    def build_follow(self, row):
+        user_id = self.user_id(row, 'user')
+        author_id = self.user_id(row, 'author')
+        if user_id == author_id:
+            raise LookupError(user_id)
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def build(self, rows):
+        """Объекты пачки; строки с неизвестными ссылками пропускаются."""
+        if self.create_users:
+            self.add_users(rows)
+        builder = {
+            'posts': self.build_post,
+            'comments': self.build_comment,
+            'follows': self.build_follow,
+        }[self.kind]
+        objs = []
+        for row in rows:
+            try:
+                objs.append(builder(row))
+            except LookupError:
+                self.skipped += 1
+        if self.kind == 'comments':
+            post_ids = set()
+            for chunk in chunked({obj.post_id for obj in objs}, LOOKUP_SIZE):
+                post_ids.update(
+                    Post.objects.filter(pk__in=chunk).values_list(
+                        'pk', flat=True
+                    )
+                )
+            self.skipped += sum(obj.post_id not in post_ids for obj in objs)
+            objs = [obj for obj in objs if obj.post_id in post_ids]
+        return objs
+
+    def insert(self, objs):
+        self.model.objects.bulk_create(
+            objs,
+            batch_size=len(objs),
+            ignore_conflicts=self.kind == 'follows',
+        )
+
+    def save(self, rows):
+        """Записывает пачку одной транзакцией и возвращает число строк.
+
+        Если база отвергла пачку, например из-за занятого id, строки
+        пишутся по одной: отвергнутые пропускаются и попадают
+        в rejected {id: ошибка}.
+        """
+        with transaction.atomic(), keep_dates(self.model):
+            objs = self.build(rows)
+            if not objs:
+                return 0
+            try:
+                with transaction.atomic():
+                    self.insert(objs)
+                return len(objs)
+            except IntegrityError:
+                pass
+            saved = 0
+            for obj in objs:
+                try:
+                    with transaction.atomic():
+                        self.insert([obj])
+                except IntegrityError as error:
+                    self.skipped += 1
+                    self.rejected[obj.pk] = str(error)
+                else:
+                    saved += 1
+        return saved
+
+
+def reset_sequences(model):
+    """После вставки с явными id сдвигает последовательность (PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild_derived():
+    """Пересчитывает то, что bulk_create обходит вместе с сигналами.
+
+    Счётчики, ленты подписок, поисковый индекс и кеш страниц.
+    """
+    with transaction.atomic():
+        counters.reconcile()
+    timeline.rebuild()
+    search.rebuild()
+    caching.invalidate(caching.SITE)
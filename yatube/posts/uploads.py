@@ -0,0 +1,106 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    SkipFile, TemporaryFileUploadHandler
+)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+SNIFF_LENGTH = 12
+# Тип содержимого и байты, которые стоят в начале файла по смещениям.
+SIGNATURES = (
+    ('image/jpeg', ((0, b'\xff\xd8\xff'),)),
+    ('image/png', ((0, b'\x89PNG\r\n\x1a\n'),)),
+    ('image/gif', ((0, b'GIF87a'),)),
+    ('image/gif', ((0, b'GIF89a'),)),
+    ('image/webp', ((0, b'RIFF'), (8, b'WEBP'))),
+    ('image/avif', ((4, b'ftypavif'),)),
+    ('image/avif', ((4, b'ftypavis'),)),
+)
+
+
+def sniff(head):
+    """Тип изображения по первым байтам файла или None."""
+    for content_type, parts in SIGNATURES:
+        if all(
+            head[offset:offset + len(magic)] == magic
+            for offset, magic in parts
+        ):
+            return content_type
+    return None
+
+
+def add_errors(request, form):
+    """Переносит в форму ошибки, найденные при приёме файлов."""
+    for field, message in getattr(request, 'upload_errors', {}).items():
+        form.add_error(field, message)
+
+
+class StreamingImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку на диск по частям, проверяя её на лету.
+
+    По первым байтам отсекает всё, кроме изображений, прекращает приём
+    файла больше POST_IMAGE_MAX_UPLOAD_SIZE и считает SHA-256
+    содержимого: он доступен как file.sha256. Анимации images.process
+    сохраняет без изменений, и хранилище берёт их имя из этого хеша,
+    не читая файл заново.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = b''
+        self.sniffed = False
+        self.received = 0
+        self.hash = hashlib.sha256()
+
+    def reject(self, message):
+        errors = self.request.__dict__.setdefault('upload_errors', {})
+        errors[self.field_name] = message
+        self.file.close()
+
+    def check_head(self):
+        self.sniffed = True
+        content_type = sniff(self.head)
+        if content_type is None:
+            self.reject('Загрузите изображение в формате JPEG, PNG, GIF, '
+                        'WebP или AVIF.')
+            return False
+        self.file.content_type = content_type
+        return True
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        limit = settings.POST_IMAGE_MAX_UPLOAD_SIZE
+        if self.received > limit:
+            self.reject(f'Файл больше {filesizeformat(limit)}.')
+            raise SkipFile()
+        if not self.sniffed:
+            self.head += raw_data[:SNIFF_LENGTH - len(self.head)]
+            if len(self.head) == SNIFF_LENGTH and not self.check_head():
+                raise SkipFile()
+        self.hash.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.sniffed and not self.check_head():
+            return None
+        self.file.sha256 = self.hash.hexdigest()
+        return super().file_complete(file_size)
+
+
+def accept_images(view):
+    """Принимает файлы запросов к view через StreamingImageUploadHandler.
+
+    Обработчики меняются до чтения тела запроса, а CsrfViewMiddleware
+    читает его раньше view, поэтому CSRF проверяется уже внутри.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [StreamingImageUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return wrapper
@@ -1,13 +1,18 @@
-from django.views.decorators.cache import cache_page
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
+from django.utils.http import urlencode
 
+from . import thumbnails, uploads
+from .caching import cached_view, depend_on
 from .forms import CommentForm, PostForm
-from .models import Comment, Group, Follow, Post, User
-from .servises import get_paginator
+from .models import Group, Follow, Post, User
+from .servises import (
+    PAGINATOR_QUANTITY, SearchPaginator, get_comments, get_paginator
+)
+from .timeline import get_feed
 
 
-@cache_page(20)
+@cached_view('feed')
 def index(request):
     """Выводит шаблон главной страницы"""
     posts = Post.objects.select_related('group', 'author').all()
@@ -18,9 +23,11 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@cached_view('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    page_obj = get_paginator(request, group.posts.all())
+    posts = group.posts.select_related('author')
+    page_obj = get_paginator(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -28,9 +35,13 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cached_view('profile:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    page_obj = get_paginator(request, author.posts.all())
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    posts = author.posts.select_related('group')
+    page_obj = get_paginator(request, posts)
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author
     ).exists()
@@ -42,10 +53,16 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@cached_view('post:{post_id}', csrf=True, depends=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        id=post_id,
+    )
+    depend_on(request, f'profile:{post.author.username}')
+    thumbnails.prefetch([post])
     form = CommentForm()
-    comments = Comment.objects.filter(post=post)
+    comments = get_comments(post)
     context = {
         'post': post,
         'form': form,
@@ -54,18 +71,31 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@cached_view('post:{post_id}')
+def post_comments(request, post_id):
+    """Следующие комментарии поста HTML-фрагментом для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments(post, request.GET.get('cursor')),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
+@uploads.accept_images
 def post_create(request):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
     )
-    user = get_object_or_404(User, username=request.user)
+    uploads.add_errors(request, form)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
-        return redirect('posts:profile', username=user.username)
+        thumbnails.enqueue(post.image)
+        return redirect('posts:profile', username=request.user.username)
     context = {
         'form': form,
     }
@@ -73,17 +103,21 @@ def post_create(request):
 
 
 @login_required
+@uploads.accept_images
 def post_edit(request, post_id):
-    post = Post.objects.get(id=post_id)
-    if request.user != post.author:
+    post = get_object_or_404(Post, id=post_id)
+    if request.user.id != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post
     )
+    uploads.add_errors(request, form)
     if form.is_valid():
         post.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post.image)
         return redirect('posts:post_detail', post_id=post_id)
     is_edit = True
     context = {
@@ -105,10 +139,22 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search(request):
+    """Посты по запросу ?q=, лучшие совпадения первыми."""
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, PAGINATOR_QUANTITY)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('cursor')),
+        'page_params': urlencode({'q': query}),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user).all()
-    page_obj = get_paginator(request, post_list)
+    posts = get_feed(request.user).select_related('author', 'group')
+    page_obj = get_paginator(request, posts)
     context = {
         'page_obj': page_obj
     }
@@ -126,9 +172,5 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follow_check = Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
-    if follow_check:
-        Follow.objects.filter(user=request.user, author=author).delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
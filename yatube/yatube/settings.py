@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,7 +51,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.QueryLogMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,7 +69,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,13 +89,70 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# DB_ENGINE: sqlite (default), postgres or postgres_pool (psycopg2 pool per
+# process, see core.db.postgresql_pool). DB_CONN_MAX_AGE keeps connections
+# open between requests; with the pool 0 is enough. DB_POOL_TIMEOUT is how
+# many seconds a thread waits for a free pooled connection.
+DB_ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgres': 'django.db.backends.postgresql',
+    'postgres_pool': 'core.db.postgresql_pool',
+}
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DB_ENGINES[DB_ENGINE],
+        'NAME': os.getenv('DB_NAME', (
+            os.path.join(BASE_DIR, 'db.sqlite3')
+            if DB_ENGINE == 'sqlite' else 'yatube'
+        )),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE', 60 if DB_ENGINE == 'postgres' else 0
+        )),
+        'POOL': {
+            'MIN': int(os.getenv('DB_POOL_MIN', 1)),
+            'MAX': int(os.getenv('DB_POOL_MAX', 20)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        },
     }
 }
 
+# DB_REPLICAS: comma-separated SQLite files or PostgreSQL hosts of read
+# replicas (aliases replica1, replica2...). Reads go there unless the client
+# wrote within the last REPLICA_PIN_SECONDS, see core.db.router.
+DB_REPLICAS = [
+    name for name in os.getenv('DB_REPLICAS', '').split(',') if name
+]
+
+DATABASE_REPLICAS = []
+
+for number, replica in enumerate(DB_REPLICAS, 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    DATABASES[alias]['NAME' if DB_ENGINE == 'sqlite' else 'HOST'] = replica
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+# SQLITE_PRODUCTION=1: WAL lets readers work alongside the writer,
+# synchronous=NORMAL is durable in WAL mode, busy_timeout makes writers wait
+# for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'temp_store': 'MEMORY',
+} if os.getenv('SQLITE_PRODUCTION', '0') == '1' else {}
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -152,13 +214,131 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'static_root'))
+
+# STATIC_STORAGE=manifest: collectstatic writes content-hashed names with
+# .gz/.br siblings (core.staticfiles). The default keeps plain names, so
+# {% static %} works without running collectstatic first.
+STATIC_STORAGES = {
+    'default': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    'manifest': 'core.staticfiles.CompressedManifestStaticFilesStorage',
+}
+
+STATICFILES_STORAGE = STATIC_STORAGES[os.getenv('STATIC_STORAGE', 'default')]
+
+# STATIC_SERVE=1 serves STATIC_ROOT from the app (no front proxy): hashed
+# names are cached for a year, the rest for STATIC_MAX_AGE seconds.
+STATIC_SERVE = os.getenv('STATIC_SERVE', '0') == '1'
+
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 60))
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# manage.py test builds thumbnails synchronously, like conftest.py does.
+TEST_RUNNER = 'posts.tests.runner.TestRunner'
+
+# Cache: locmem (default), file, db or memcached; CACHE_L1_TIMEOUT > 0
+# keeps hot keys in process memory for that many seconds over the shared one.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'cache_table'),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+}
+
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('CACHE_BACKEND', 'locmem')
+]
+
+# locmem lives in each worker's memory and misses other workers'
+# invalidations, so pages and scope versions there expire quickly.
+CACHE_PROCESS_LOCAL = CACHE_BACKEND == CACHE_BACKENDS['locmem'][0]
+
+# Seconds a cached page lives: 6 hours, or 20 on a per-process cache.
+PAGE_CACHE_TIMEOUT = int(os.getenv(
+    'PAGE_CACHE_TIMEOUT', 20 if CACHE_PROCESS_LOCAL else 60 * 60 * 6
+))
+
+CACHE_L1_TIMEOUT = int(os.getenv('CACHE_L1_TIMEOUT', 0))
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_LOCATION),
     }
 }
 
+if CACHE_L1_TIMEOUT:
+    CACHES['shared'] = CACHES['default']
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.TwoLevelCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'L1_TIMEOUT': CACHE_L1_TIMEOUT},
+    }
+
+POST_IMAGE_MAX_SIDE = int(os.getenv('POST_IMAGE_MAX_SIDE', 1920))
+
+POST_IMAGE_QUALITY = int(os.getenv('POST_IMAGE_QUALITY', 85))
+
+POST_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.getenv('POST_IMAGE_MAX_UPLOAD_SIZE', 20 * 1024 * 1024)
+)
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# MEDIA_SERVE serves MEDIA_ROOT without DEBUG (core.media): python streams
+# files from the app with Range support, x-accel and x-sendfile hand them to
+# nginx (internal location MEDIA_ACCEL_PREFIX) or Apache. Content-addressed
+# images and thumbnails are cached for a year, the rest for MEDIA_MAX_AGE.
+MEDIA_SERVE = os.getenv('MEDIA_SERVE', '')
+
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', 60 * 60))
+
+# Share of requests measured in detail by core.middleware.PerformanceMiddleware
+# (0..1); unsampled requests slower than PERF_SLOW_MS are still logged.
+PERF_SAMPLE_RATE = float(os.getenv('PERF_SAMPLE_RATE', 0))
+
+PERF_SLOW_MS = float(os.getenv('PERF_SLOW_MS', 1000))
+
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', '1') == '1'
+
+# SQL fingerprint stats (core.querylog), off by default since every query
+# pays for it: queries slower than QUERYLOG_SLOW_MS are logged to yatube.sql
+# with their origin in the project code.
+QUERYLOG_ENABLED = os.getenv('QUERYLOG_ENABLED', '0') == '1'
+
+QUERYLOG_SLOW_MS = float(os.getenv('QUERYLOG_SLOW_MS', 100))
+
+QUERYLOG_FLUSH_SECONDS = float(os.getenv('QUERYLOG_FLUSH_SECONDS', 10))
+
+# Per-process cap on (view, fingerprint) pairs; the rest share one row.
+QUERYLOG_MAX_STATS = int(os.getenv('QUERYLOG_MAX_STATS', 1000))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERF_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'yatube.sql': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -3,11 +3,20 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.media import serve as serve_media
+from core.views import query_log
+
 urlpatterns = [
+    path(
+        'admin/querylog/',
+        admin.site.admin_view(query_log),
+        name='query_log',
+    ),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
     path('', include('posts.urls', namespace='posts')),
 ]
 
@@ -15,7 +24,12 @@ handler500 = 'core.views.server_error'
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.csrf_failure'
 
-if settings.DEBUG:
+if settings.MEDIA_SERVE:
+    urlpatterns.append(path(
+        f'{settings.MEDIA_URL.lstrip("/")}<path:path>', serve_media,
+        name='media',
+    ))
+elif settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )